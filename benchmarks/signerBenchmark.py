@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bnipython.lib.util.signer import Signer
+from bnipython.lib.util.utils import (generateClientId, generateSignature, generateSignatureServiceSnapBI,
+                                      getTimestamp, getTimestampBNIMove)
+
+CONFIG = {'appName': 'benchmark', 'apiSecret': 'b8ba2d2c-5b1a-4e84-b4a6-7b4a4b7b5c3d'}
+BODY = b'{"accountNo":"113183203","clientId":"IDBNIYmVuY2htYXJr"}'
+TOKEN = 'benchmark-access-token'
+TIMESTAMP = '2024-01-01T00:00:00+07:00'
+
+
+def cases(signer):
+    return [
+        ('jwt signature',
+         lambda: generateSignature({'bodyBytes': BODY, 'apiSecret': CONFIG['apiSecret']}),
+         lambda: signer.jwt(BODY)),
+        ('snap signature',
+         lambda: generateSignatureServiceSnapBI({
+             'bodyBytes': BODY, 'method': 'POST', 'url': '/snap-service/v1/balance-inquiry',
+             'accessToken': TOKEN, 'timeStamp': TIMESTAMP, 'apiSecret': CONFIG['apiSecret']}),
+         lambda: signer.snapSignature('POST', '/snap-service/v1/balance-inquiry', TOKEN, BODY, TIMESTAMP)),
+        ('client id',
+         lambda: generateClientId(CONFIG['appName']),
+         lambda: signer.clientId),
+        ('timestamp',
+         getTimestamp,
+         signer.timestamp),
+        ('timestamp bniMove',
+         getTimestampBNIMove,
+         signer.timestampBNIMove)
+    ]
+
+
+def measure(fn, number, rounds):
+    return min(timeit.repeat(fn, number=number, repeat=rounds)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the per-call helpers with the precomputed Signer')
+    parser.add_argument('--number', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    signer = Signer(CONFIG)
+    print(f'{"operation":<18} {"utils us":>10} {"signer us":>10} {"speedup":>8}')
+    for name, before, after in cases(signer):
+        old = measure(before, args.number, args.rounds)
+        new = measure(after, args.number, args.rounds)
+        print(f'{name:<18} {old:>10.2f} {new:>10.2f} {old / new:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bnipython.lib.net.httpClient import HttpClient, prepareRequest
+
+RESPONSE = json.dumps({
+    'getBalanceResponse': {
+        'clientId': 'IDBNIYmVuY2htYXJr',
+        'parameters': {
+            'responseCode': '0001',
+            'responseMessage': 'Request has been processed successfully',
+            'responseTimestamp': '2024-01-01T00:00:00.000Z',
+            'customerName': 'Bpk BENCHMARK',
+            'accountCurrency': 'IDR',
+            'accountBalance': 1000000
+        }
+    }
+}).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # answer in one segment so the numbers measure the client, not delayed-ack stalls
+    disable_nagle_algorithm = True
+    wbufsize = 65536
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+
+def startServer():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def prepared(port):
+    return prepareRequest({
+        'method': 'POST',
+        'apiKey': 'benchmark-api-key',
+        'accessToken': 'benchmark-access-token',
+        'url': f'http://127.0.0.1:{port}',
+        'path': '/H2H/v2/getbalance',
+        'product': 'OneGatePayment',
+        'payload': b'{"accountNo":"113183203","clientId":"IDBNIYmVuY2htYXJr","signature":"x.y.z"}'
+    })
+
+
+def run(transport, port, requests, concurrency):
+    client = HttpClient(options={
+        'transport': transport,
+        'poolMaxsize': concurrency,
+        'retry': False,
+        'circuitBreaker': False
+    })
+    request = prepared(port)
+    for i in range(min(requests, 100)):
+        client.send(request)
+    started = time.perf_counter()
+    if concurrency == 1:
+        for i in range(requests):
+            client.send(request)
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(lambda i: client.send(request), range(requests)))
+    elapsed = time.perf_counter() - started
+    client.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the requests and urllib3 transports against a local server')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    server = startServer()
+    port = server.server_address[1]
+    print(f'{"transport":<10} {"threads":>7} {"req/s":>10} {"us/req":>10}')
+    for concurrency in args.concurrency:
+        for transport in ('requests', 'urllib3'):
+            elapsed = min(run(transport, port, args.requests, concurrency) for i in range(args.rounds))
+            print(f'{transport:<10} {concurrency:>7} {args.requests / elapsed:>10.0f} {elapsed / args.requests * 1e6:>10.1f}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
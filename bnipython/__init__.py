@@ -1,10 +1,15 @@
-from bnipython.lib.bniClient import BNIClient
-from bnipython.lib.api.oneGatePayment import OneGatePayment
-from bnipython.lib.api.snapBI import SnapBI
-from bnipython.lib.api.rdn import RDN
-from bnipython.lib.api.rdl import RDL
-from bnipython.lib.api.rdf import RDF
-from bnipython.lib.api.bniMove import BNIMove
+from bnipython.lib.bniClient import BNIClient, AsyncBNIClient
+from bnipython.lib.api.oneGatePayment import OneGatePayment, AsyncOneGatePayment
+from bnipython.lib.api.snapBI import SnapBI, AsyncSnapBI
+from bnipython.lib.api.rdn import RDN, AsyncRDN
+from bnipython.lib.api.rdl import RDL, AsyncRDL
+from bnipython.lib.api.rdf import RDF, AsyncRDF
+from bnipython.lib.api.bniMove import BNIMove, AsyncBNIMove
+from bnipython.lib.workflow.bulkPayment import BulkPayment, AsyncBulkPayment
+from bnipython.lib.workflow.snapTransferBatch import SnapTransferBatch, AsyncSnapTransferBatch
+from bnipython.lib.workflow.balanceSnapshot import BalanceSnapshot, AsyncBalanceSnapshot
+from bnipython.lib.workflow.paymentStatusPoller import PaymentStatusPoller, AsyncPaymentStatusPoller
+from bnipython.lib.workflow.historySync import HistorySync, AsyncHistorySync
 
 import sys
 sys.modules['BNIClient'] = BNIClient
@@ -13,4 +18,21 @@ sys.modules['SnapBI'] = SnapBI
 sys.modules['RDN'] = RDN
 sys.modules['RDF'] = RDF
 sys.modules['RDL'] = RDL
-sys.modules['BNIMove'] = BNIMove
\ No newline at end of file
+sys.modules['BNIMove'] = BNIMove
+sys.modules['AsyncBNIClient'] = AsyncBNIClient
+sys.modules['AsyncOneGatePayment'] = AsyncOneGatePayment
+sys.modules['AsyncSnapBI'] = AsyncSnapBI
+sys.modules['AsyncRDN'] = AsyncRDN
+sys.modules['AsyncRDF'] = AsyncRDF
+sys.modules['AsyncRDL'] = AsyncRDL
+sys.modules['AsyncBNIMove'] = AsyncBNIMove
+sys.modules['BulkPayment'] = BulkPayment
+sys.modules['AsyncBulkPayment'] = AsyncBulkPayment
+sys.modules['SnapTransferBatch'] = SnapTransferBatch
+sys.modules['AsyncSnapTransferBatch'] = AsyncSnapTransferBatch
+sys.modules['BalanceSnapshot'] = BalanceSnapshot
+sys.modules['AsyncBalanceSnapshot'] = AsyncBalanceSnapshot
+sys.modules['PaymentStatusPoller'] = PaymentStatusPoller
+sys.modules['AsyncPaymentStatusPoller'] = AsyncPaymentStatusPoller
+sys.modules['HistorySync'] = HistorySync
+sys.modules['AsyncHistorySync'] = AsyncHistorySync
@@ -1,14 +1,41 @@
-from bnipython.lib.net.httpClient import HttpClient
-from bnipython.lib.util.utils import generateSignature, getTimestampBNIMove
+from bnipython.lib.util.utils import encodeBody
 from bnipython.lib.util.response import responseBNIMove
 
 class BNIMove():
     def __init__(self, client):
+        self.bniClient = client
         self.client = client.config
         self.baseUrl = client.getBaseUrl()
         self.config = client.getConfig()
-        self.token = client.getToken()
-        self.httpClient = HttpClient()
+        self.httpClient = client.httpClient
+        self.signer = client.signer
+
+    def getToken(self):
+        return self.bniClient.getToken()
+
+    def prepare(self, path, payload, data, timeStamp, token):
+        # prescreening signs the body with the timestamp added but sends it without, so it needs both encodings;
+        # saveimage signs and sends the same dict and encodes it once
+        dataBytes = encodeBody(data)
+        payloadBytes = dataBytes if data is payload else encodeBody(payload)
+        signature = self.signer.jwt(payloadBytes)
+        return {
+            'method': 'POST',
+            'apiKey': self.client['apiKey'],
+            'accessToken': token,
+            'url': f'{self.baseUrl}',
+            'path': path,
+            'product': 'BNIMove',
+            'signature': signature.split('.')[2],
+            'timestamp': timeStamp,
+            'payload': dataBytes
+        }
+
+    def send(self, path, payload, data, timeStamp):
+        res = self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.requestV2(self.prepare(path, payload, data, timeStamp, token)))
+        return responseBNIMove(params={'res': res})
 
     def prescreening(self, params={
         'kodeMitra',
@@ -33,21 +60,9 @@ class BNIMove():
         'deskripsi',
         'email'
     }):
-        timeStamp = getTimestampBNIMove()
+        timeStamp = self.signer.timestampBNIMove()
         payload = {**params, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/digiloan/prescreening',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': params
-        })
-        return responseBNIMove(params={'res': res})
+        return self.send('/digiloan/prescreening', payload, params, timeStamp)
     
     def saveImage(self, params={
         'Id',
@@ -57,18 +72,17 @@ class BNIMove():
         'extensionFile',
         'dataBase64',
     }):
-        timeStamp = getTimestampBNIMove()
+        timeStamp = self.signer.timestampBNIMove()
         payload = {**params, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/digiloan/saveimage',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': payload
-        })
-        return responseBNIMove(params={'res': res})
\ No newline at end of file
+        return self.send('/digiloan/saveimage', payload, payload, timeStamp)
+
+
+class AsyncBNIMove(BNIMove):
+    async def getToken(self):
+        return await self.bniClient.getToken()
+
+    async def send(self, path, payload, data, timeStamp):
+        res = await self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.requestV2(self.prepare(path, payload, data, timeStamp, token)))
+        return responseBNIMove(params={'res': res})
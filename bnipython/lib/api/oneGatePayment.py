@@ -1,55 +1,68 @@
-from bnipython.lib.net.httpClient import HttpClient
-from bnipython.lib.util.utils import generateClientId, generateSignature
+from bnipython.lib.util.utils import encodeBody, extendBody
 from bnipython.lib.util.response import responseOGP
+from bnipython.lib.net.retry import SAFE, STATUS_CHECK, UNSAFE
+
+idempotency = {
+    '/H2H/v2/getbalance': SAFE,
+    '/H2H/v2/getinhouseinquiry': SAFE,
+    '/H2H/v2/getpaymentstatus': SAFE,
+    '/H2H/v2/getinterbankinquiry': SAFE,
+    '/H2H/v2/dopayment': STATUS_CHECK,
+    '/H2H/v2/getinterbankpayment': STATUS_CHECK
+}
 
 
 class OneGatePayment():
     def __init__(self, client):
+        self.bniClient = client
         self.client = client.config
         self.baseUrl = client.getBaseUrl()
         self.config = client.getConfig()
-        self.token = client.getToken()
-        self.httpClient = HttpClient()
+        self.httpClient = client.httpClient
+        self.signer = client.signer
 
-    def getBalance(self, params={'accountNo'}):
-        payload = {}
-        body = {
-            'accountNo': params['accountNo'],
-            'clientId': generateClientId(self.client['appName'])
-        }
-        payload = body
-        payload['signature'] = generateSignature(
-            {'body': body, 'apiSecret': self.client['apiSecret']})
+    def getToken(self):
+        return self.bniClient.getToken()
 
-        res = self.httpClient.request({
+    def prepare(self, path, body, token):
+        bodyBytes = encodeBody(body)
+        signature = self.signer.jwt(bodyBytes)
+        return {
             'method': 'POST',
             'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
+            'accessToken': token,
             'url': f'{self.baseUrl}',
-            'path': '/H2H/v2/getbalance',
-            'data': payload
-        })
-        return responseOGP(params={'res': res, 'resObj': 'getBalanceResponse'})
+            'path': path,
+            'product': 'OneGatePayment',
+            'payload': extendBody(bodyBytes, {'signature': signature}),
+            'idempotency': idempotency.get(path, UNSAFE),
+            'statusCheck': self.statusCheck(path, body)
+        }
 
-    def getInHouseInquiry(self, params={'accountNo'}):
-        payload = {}
+    def statusCheck(self, path, body):
+        if idempotency.get(path) != STATUS_CHECK:
+            return None
+        return lambda: self.getPaymentStatus({'customerReferenceNumber': body['customerReferenceNumber']})
+
+    def send(self, path, body, resObj):
+        res = self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.request(self.prepare(path, body, token)))
+        return responseOGP(params={'res': res, 'resObj': resObj})
+
+    def getBalance(self, params={'accountNo'}):
         body = {
             'accountNo': params['accountNo'],
-            'clientId': generateClientId(self.client['appName'])
+            'clientId': self.signer.clientId
         }
-        payload = body
-        payload['signature'] = generateSignature(
-            {'body': body, 'apiSecret': self.client['apiSecret']})
+        return self.send('/H2H/v2/getbalance', body, 'getBalanceResponse')
 
-        res = self.httpClient.request({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/H2H/v2/getinhouseinquiry',
-            'data': payload
-        })
-        return responseOGP(params={'res': res, 'resObj': 'getInHouseInquiryResponse'})
+    def getInHouseInquiry(self, params={'accountNo'}):
+        body = {
+            'accountNo': params['accountNo'],
+            'clientId': self.signer.clientId
+        }
+        return self.send('/H2H/v2/getinhouseinquiry', body, 'getInHouseInquiryResponse')
 
     def doPayment(self,
                   params={
@@ -68,9 +81,8 @@ class OneGatePayment():
                       'destinationBankCode',
                       'chargingModelId'
                   }):
-        payload = {}
         body = {
-            'clientId': generateClientId(self.client['appName']),
+            'clientId': self.signer.clientId,
             'customerReferenceNumber': params['customerReferenceNumber'],
             'paymentMethod': params['paymentMethod'],
             'debitAccountNo': params['debitAccountNo'],
@@ -87,39 +99,15 @@ class OneGatePayment():
             'chargingModelId': params['chargingModelId']
         }
 
-        payload = body
-        payload['signature'] = generateSignature(
-            {'body': body, 'apiSecret': self.client['apiSecret']})
-
-        res = self.httpClient.request({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/H2H/v2/dopayment',
-            'data': payload
-        })
-        return responseOGP(params={'res': res, 'resObj': 'doPaymentResponse'})
+        return self.send('/H2H/v2/dopayment', body, 'doPaymentResponse')
 
     def getPaymentStatus(self, params={'customerReferenceNumber'}):
-        payload = {}
         body = {
-            'clientId': generateClientId(self.client['appName']),
+            'clientId': self.signer.clientId,
             'customerReferenceNumber': params['customerReferenceNumber']
         }
 
-        payload = body
-        payload['signature'] = generateSignature(
-            {'body': body, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.request({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/H2H/v2/getpaymentstatus',
-            'data': payload
-        })
-        return responseOGP(params={'res': res, 'resObj': 'getPaymentStatusResponse'})
+        return self.send('/H2H/v2/getpaymentstatus', body, 'getPaymentStatusResponse')
 
     def getInterBankInquiry(self,  params={
         'customerReferenceNumber',
@@ -127,26 +115,14 @@ class OneGatePayment():
         'destinationBankCode',
         'destinationAccountNum'
     }):
-        payload = {}
         body = {
-            'clientId': generateClientId(self.client['appName']),
+            'clientId': self.signer.clientId,
             'customerReferenceNumber': params['customerReferenceNumber'],
             'accountNum': params['accountNum'],
             'destinationBankCode': params['destinationBankCode'],
             'destinationAccountNum': params['destinationAccountNum']
         }
-        payload = body
-        payload['signature'] = generateSignature(
-            {'body': body, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.request({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/H2H/v2/getinterbankinquiry',
-            'data': payload
-        })
-        return responseOGP(params={'res': res, 'resObj': 'getInterbankInquiryResponse'})
+        return self.send('/H2H/v2/getinterbankinquiry', body, 'getInterbankInquiryResponse')
 
     def getInterBankPayment(self, params={
         'customerReferenceNumber',
@@ -158,9 +134,8 @@ class OneGatePayment():
         'accountNum',
         'retrievalReffNum'
     }):
-        payload = {}
         body = {
-            'clientId': generateClientId(self.client['appName']),
+            'clientId': self.signer.clientId,
             'customerReferenceNumber': params['customerReferenceNumber'],
             'amount': params['amount'],
             'destinationAccountNum': params['destinationAccountNum'],
@@ -170,18 +145,7 @@ class OneGatePayment():
             'accountNum': params['accountNum'],
             'retrievalReffNum': params['retrievalReffNum']
         }
-        payload = body
-        payload['signature'] = generateSignature(
-            {'body': body, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.request({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/H2H/v2/getinterbankpayment',
-            'data': payload
-        })
-        return responseOGP(params={'res': res, 'resObj': 'getInterbankPaymentResponse'})
+        return self.send('/H2H/v2/getinterbankpayment', body, 'getInterbankPaymentResponse')
 
    
     # Requested by WDC
@@ -240,3 +204,14 @@ class OneGatePayment():
     #         'data': payload
     #     })
     #     return responseOGP(params={'res': res, 'resObj': 'holdAmountReleaseResponse'})
+
+
+class AsyncOneGatePayment(OneGatePayment):
+    async def getToken(self):
+        return await self.bniClient.getToken()
+
+    async def send(self, path, body, resObj):
+        res = await self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.request(self.prepare(path, body, token)))
+        return responseOGP(params={'res': res, 'resObj': resObj})
@@ -1,14 +1,51 @@
-from bnipython.lib.net.httpClient import HttpClient
-from bnipython.lib.util.utils import generateUUID, generateSignature, getTimestamp
+from bnipython.lib.util.utils import generateUUID, encodeBody, extendBody
 from bnipython.lib.util.response import responseRDF
+from bnipython.lib.net.retry import STATUS_CHECK, pathIdempotency
+
 
 class RDF():
     def __init__(self, client):
+        self.bniClient = client
         self.client = client.config
         self.baseUrl = client.getBaseUrl()
         self.config = client.getConfig()
-        self.token = client.getToken()
-        self.httpClient = HttpClient()
+        self.httpClient = client.httpClient
+        self.signer = client.signer
+
+    def getToken(self):
+        return self.bniClient.getToken()
+
+    def prepare(self, path, request, timeStamp, token):
+        payload = encodeBody({'request': request})
+        signature = self.signer.jwt(extendBody(payload, {'timestamp': timeStamp}))
+        return {
+            'method': 'POST',
+            'apiKey': self.client['apiKey'],
+            'accessToken': token,
+            'url': f'{self.baseUrl}',
+            'path': path,
+            'product': 'RDF',
+            'signature': signature.split('.')[2],
+            'timestamp': timeStamp,
+            'payload': payload,
+            'idempotency': pathIdempotency(path),
+            'statusCheck': self.statusCheck(path, request)
+        }
+
+    def statusCheck(self, path, request):
+        if pathIdempotency(path) != STATUS_CHECK:
+            return None
+        return lambda: self.inquiryPaymentStatus({
+            'companyId': request['header']['companyId'],
+            'parentCompanyId': request['header']['parentCompanyId'],
+            'requestedUuid': request['header']['requestUuid']
+        })
+
+    def send(self, path, request, timeStamp):
+        res = self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.requestV2(self.prepare(path, request, timeStamp, token)))
+        return responseRDF(params={'res': res})
     
     def inquiryAccountBalance(self, params={
         'companyId', 
@@ -16,7 +53,7 @@ class RDF():
         'requestUuid',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -27,21 +64,7 @@ class RDF():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/inquiry/account/balance',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/inquiry/account/balance', payload['request'], timeStamp)
     
     def inquiryAccountInfo(self, params={
         'companyId', 
@@ -49,7 +72,7 @@ class RDF():
         'requestUuid',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -60,21 +83,7 @@ class RDF():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/inquiry/account/info',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/inquiry/account/info', payload['request'], timeStamp)
 
     def paymentUsingTransfer(self, params={
         'companyId', 
@@ -86,7 +95,7 @@ class RDF():
         'amount',
         'remark'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {
             'header': { 
@@ -100,21 +109,7 @@ class RDF():
             'amount': params['amount'], 
             'remark': params['remark']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/payment/transfer',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/payment/transfer', payload['request'], timeStamp)
 
     def registerInvestor(self, params={
         'companyId',
@@ -165,7 +160,7 @@ class RDF():
         'ownedBankAccNo',
         'idIssuingDate'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -220,21 +215,7 @@ class RDF():
             'ownedBankAccNo': params['ownedBankAccNo'],
             'idIssuingDate': params['idIssuingDate']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/register/investor',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/register/investor', payload['request'], timeStamp)
 
     def registerInvestorAccount(self, params={
         'companyId',
@@ -247,7 +228,7 @@ class RDF():
         'bnisId',
         'sre'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -263,28 +244,14 @@ class RDF():
             'branchId': params['branchId'],        
             'sre': params['sre'],
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/register/investor/account',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': { 'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/register/investor/account', payload['request'], timeStamp)
 
     def inquiryAccountHistory(self, params={
         'companyId', 
         'parentCompanyId',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -295,21 +262,7 @@ class RDF():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/inquiry/account/history',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': { 'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/inquiry/account/history', payload['request'], timeStamp)
 
     def paymentUsingClearing(self, params={
         'companyId', 
@@ -326,7 +279,7 @@ class RDF():
         'remark',
         'chargingType'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {
             'header': { 
@@ -345,21 +298,7 @@ class RDF():
             'remark': params['remark'],
             'chargingType': params['chargingType']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/payment/clearing',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/payment/clearing', payload['request'], timeStamp)
     
     def paymentUsingRTGS(self, params={
         'companyId', 
@@ -376,7 +315,7 @@ class RDF():
         'remark',
         'chargingType'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {
             'header': { 
@@ -395,21 +334,7 @@ class RDF():
             'remark': params['remark'],
             'chargingType': params['chargingType']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/payment/rtgs',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/payment/rtgs', payload['request'], timeStamp)
     
     def inquiryPaymentStatus(self, params={
         'companyId', 
@@ -417,7 +342,7 @@ class RDF():
         'requestUuid',
         'requestedUuid'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -428,21 +353,7 @@ class RDF():
             },
             'requestedUuid': params['requestedUuid']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/inquiry/payment/status',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/inquiry/payment/status', payload['request'], timeStamp)
     
     def inquiryInterbankAccount(self, params={
         'companyId', 
@@ -452,7 +363,7 @@ class RDF():
         'beneficiaryBankCode',
         'beneficiaryAccountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -465,21 +376,7 @@ class RDF():
             'beneficiaryBankCode': params['beneficiaryBankCode'],
             'beneficiaryAccountNumber': params['beneficiaryAccountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/inquiry/interbank/account',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/inquiry/interbank/account', payload['request'], timeStamp)
     
     def paymentUsingInterbank(self, params={
         'companyId', 
@@ -492,7 +389,7 @@ class RDF():
         'beneficiaryAccountName',
         'amount'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -508,21 +405,7 @@ class RDF():
             'beneficiaryAccountName': params['beneficiaryAccountName'],
             'amount': params['amount']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp}}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']}
-        )
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdf/v2.1/payment/interbank',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDF(params={'res': res})
+        return self.send('/rdf/v2.1/payment/interbank', payload['request'], timeStamp)
 
     def faceRecognition(self, params={
         'companyId',
@@ -544,7 +427,7 @@ class RDF():
         'country',
         'selfiePhoto'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -569,18 +452,15 @@ class RDF():
             'country': params['country'],
             'selfiePhoto': params['selfiePhoto']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rekdana/v1.1/face/recog',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
+        return self.send('/rekdana/v1.1/face/recog', payload['request'], timeStamp)
+
+
+class AsyncRDF(RDF):
+    async def getToken(self):
+        return await self.bniClient.getToken()
+
+    async def send(self, path, request, timeStamp):
+        res = await self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.requestV2(self.prepare(path, request, timeStamp, token)))
         return responseRDF(params={'res': res})
-        
\ No newline at end of file
@@ -1,14 +1,51 @@
-from bnipython.lib.net.httpClient import HttpClient
-from bnipython.lib.util.utils import generateUUID, generateSignature, getTimestamp
+from bnipython.lib.util.utils import generateUUID, encodeBody, extendBody
 from bnipython.lib.util.response import responseRDL
+from bnipython.lib.net.retry import STATUS_CHECK, pathIdempotency
+
 
 class RDL():
     def __init__(self, client):
+        self.bniClient = client
         self.client = client.config
         self.baseUrl = client.getBaseUrl()
         self.config = client.getConfig()
-        self.token = client.getToken()
-        self.httpClient = HttpClient()
+        self.httpClient = client.httpClient
+        self.signer = client.signer
+
+    def getToken(self):
+        return self.bniClient.getToken()
+
+    def prepare(self, path, request, timeStamp, token):
+        payload = encodeBody({'request': request})
+        signature = self.signer.jwt(extendBody(payload, {'timestamp': timeStamp}))
+        return {
+            'method': 'POST',
+            'apiKey': self.client['apiKey'],
+            'accessToken': token,
+            'url': f'{self.baseUrl}',
+            'path': path,
+            'product': 'RDL',
+            'signature': signature.split('.')[2],
+            'timestamp': timeStamp,
+            'payload': payload,
+            'idempotency': pathIdempotency(path),
+            'statusCheck': self.statusCheck(path, request)
+        }
+
+    def statusCheck(self, path, request):
+        if pathIdempotency(path) != STATUS_CHECK:
+            return None
+        return lambda: self.inquiryPaymentStatus({
+            'companyId': request['header']['companyId'],
+            'parentCompanyId': request['header']['parentCompanyId'],
+            'requestedUuid': request['header']['requestUuid']
+        })
+
+    def send(self, path, request, timeStamp, resObj):
+        res = self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.requestV2(self.prepare(path, request, timeStamp, token)))
+        return responseRDL(params={'res': res, 'resObj': resObj})
 
     def faceRecognition(self, params={
         'companyId',
@@ -30,7 +67,7 @@ class RDL():
         'country',
         'selfiePhoto'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -57,20 +94,7 @@ class RDL():
             'country': params['country'],
             'selfiePhoto': params['selfiePhoto']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rekdana/v1.1/face/recog',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'faceRecognitionResponse'})
+        return self.send('/rekdana/v1.1/face/recog', payload['request'], timeStamp, 'faceRecognitionResponse')
         
     def registerInvestor(self, params={
         'companyId',
@@ -121,7 +145,7 @@ class RDL():
         'ownedBankAccNo',
         'idIssuingDate'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -176,20 +200,7 @@ class RDL():
             'ownedBankAccNo': params['ownedBankAccNo'],
             'idIssuingDate': params['idIssuingDate']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/register/investor',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'registerInvestorResponse'})
+        return self.send('/p2pl/v2.1/register/investor', payload['request'], timeStamp, 'registerInvestorResponse')
     
     def registerInvestorAccount(self, params={
         'companyId',
@@ -202,7 +213,7 @@ class RDL():
         'bnisId',
         'sre'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -218,20 +229,7 @@ class RDL():
             'branchId': params['branchId'],        
             'sre': params['sre'],
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/register/investor/account',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'registerInvestorAccountResponse'})
+        return self.send('/p2pl/v2.1/register/investor/account', payload['request'], timeStamp, 'registerInvestorAccountResponse')
     
 
     def inquiryAccountInfo(self, params={
@@ -239,7 +237,7 @@ class RDL():
         'parentCompanyId',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -250,27 +248,14 @@ class RDL():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/inquiry/account/info',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'inquiryAccountInfoResponse'})
+        return self.send('/p2pl/v2.1/inquiry/account/info', payload['request'], timeStamp, 'inquiryAccountInfoResponse')
     
     def inquiryAccountBalance(self, params={
         'companyId',
         'parentCompanyId',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -281,27 +266,14 @@ class RDL():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/inquiry/account/balance',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'inquiryAccountBalanceResponse'})
+        return self.send('/p2pl/v2.1/inquiry/account/balance', payload['request'], timeStamp, 'inquiryAccountBalanceResponse')
     
     def inquiryAccountHistory(self, params={
         'companyId',
         'parentCompanyId',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -312,20 +284,7 @@ class RDL():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/inquiry/account/history',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'inquiryAccountHistoryResponse'})
+        return self.send('/p2pl/v2.1/inquiry/account/history', payload['request'], timeStamp, 'inquiryAccountHistoryResponse')
     
     def paymentUsingTransfer(self, params={
         'companyId',
@@ -336,7 +295,7 @@ class RDL():
         'amount',
         'remark'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -351,27 +310,14 @@ class RDL():
             'amount': params['amount'],
             'remark': params['remark']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/payment/transfer',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'paymentUsingTransferResponse'})
+        return self.send('/p2pl/v2.1/payment/transfer', payload['request'], timeStamp, 'paymentUsingTransferResponse')
     
     def inquiryPaymentStatus(self, params={
         'companyId',
         'parentCompanyId',
         'requestedUuid'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -382,20 +328,7 @@ class RDL():
             },
             'requestedUuid': params['requestedUuid']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/inquiry/payment/status',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'inquiryPaymentStatusResponse'})
+        return self.send('/p2pl/v2.1/inquiry/payment/status', payload['request'], timeStamp, 'inquiryPaymentStatusResponse')
     
     def paymentUsingClearing(self, params={
         'companyId',
@@ -411,7 +344,7 @@ class RDL():
         'remark',
         'chargingType'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -431,20 +364,7 @@ class RDL():
             'remark': params['remark'],
             'chargingType': params['chargingType']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/payment/clearing',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'paymentUsingClearingResponse'})
+        return self.send('/p2pl/v2.1/payment/clearing', payload['request'], timeStamp, 'paymentUsingClearingResponse')
     
     def paymentUsingRTGS(self, params={
         'companyId',
@@ -460,7 +380,7 @@ class RDL():
         'remark',
         'chargingType'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -480,20 +400,7 @@ class RDL():
             'remark': params['remark'],
             'chargingType': params['chargingType']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/payment/rtgs',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'paymentUsingRTGSResponse'})
+        return self.send('/p2pl/v2.1/payment/rtgs', payload['request'], timeStamp, 'paymentUsingRTGSResponse')
     
     def inquiryInterbankAccount(self, params={
         'companyId',
@@ -502,7 +409,7 @@ class RDL():
         'beneficiaryBankCode',
         'beneficiaryAccountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -515,20 +422,7 @@ class RDL():
             'beneficiaryBankCode': params['beneficiaryBankCode'],
             'beneficiaryAccountNumber': params['beneficiaryAccountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/inquiry/interbank/account',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'inquiryInterbankAccountResponse'})
+        return self.send('/p2pl/v2.1/inquiry/interbank/account', payload['request'], timeStamp, 'inquiryInterbankAccountResponse')
     
     def paymentUsingInterbank(self, params={
         'companyId',
@@ -540,7 +434,7 @@ class RDL():
         'beneficiaryBankName',
         'amount'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -556,17 +450,15 @@ class RDL():
             'beneficiaryBankName': params['beneficiaryBankName'],
             'amount': params['amount']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/p2pl/v2.1/payment/interbank',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDL(params={'res': res, 'resObj': 'paymentUsingInterbankResponse'})
\ No newline at end of file
+        return self.send('/p2pl/v2.1/payment/interbank', payload['request'], timeStamp, 'paymentUsingInterbankResponse')
+
+
+class AsyncRDL(RDL):
+    async def getToken(self):
+        return await self.bniClient.getToken()
+
+    async def send(self, path, request, timeStamp, resObj):
+        res = await self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.requestV2(self.prepare(path, request, timeStamp, token)))
+        return responseRDL(params={'res': res, 'resObj': resObj})
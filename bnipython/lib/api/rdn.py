@@ -1,14 +1,51 @@
-from bnipython.lib.net.httpClient import HttpClient
-from bnipython.lib.util.utils import generateUUID, generateSignature, getTimestamp
+from bnipython.lib.util.utils import generateUUID, encodeBody, extendBody
 from bnipython.lib.util.response import responseRDN
+from bnipython.lib.net.retry import STATUS_CHECK, pathIdempotency
+
 
 class RDN():
     def __init__(self, client):
+        self.bniClient = client
         self.client = client.config
         self.baseUrl = client.getBaseUrl()
         self.config = client.getConfig()
-        self.token = client.getToken()
-        self.httpClient = HttpClient()
+        self.httpClient = client.httpClient
+        self.signer = client.signer
+
+    def getToken(self):
+        return self.bniClient.getToken()
+
+    def prepare(self, path, request, timeStamp, token):
+        payload = encodeBody({'request': request})
+        signature = self.signer.jwt(extendBody(payload, {'timestamp': timeStamp}))
+        return {
+            'method': 'POST',
+            'apiKey': self.client['apiKey'],
+            'accessToken': token,
+            'url': f'{self.baseUrl}',
+            'path': path,
+            'product': 'RDN',
+            'signature': signature.split('.')[2],
+            'timestamp': timeStamp,
+            'payload': payload,
+            'idempotency': pathIdempotency(path),
+            'statusCheck': self.statusCheck(path, request)
+        }
+
+    def statusCheck(self, path, request):
+        if pathIdempotency(path) != STATUS_CHECK:
+            return None
+        return lambda: self.inquiryPaymentStatus({
+            'companyId': request['header']['companyId'],
+            'parentCompanyId': request['header']['parentCompanyId'],
+            'requestedUuid': request['header']['requestUuid']
+        })
+
+    def send(self, path, request, timeStamp, resObj):
+        res = self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.requestV2(self.prepare(path, request, timeStamp, token)))
+        return responseRDN(params={'res': res, 'resObj': resObj})
 
     def faceRecognition(self, params={
         'companyId',
@@ -30,7 +67,7 @@ class RDN():
         'country',
         'selfiePhoto'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -57,20 +94,7 @@ class RDN():
             'country': params['country'],
             'selfiePhoto': params['selfiePhoto']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rekdana/v1.1/face/recog',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'faceRecognitionResponse'})
+        return self.send('/rekdana/v1.1/face/recog', payload['request'], timeStamp, 'faceRecognitionResponse')
         
     def registerInvestor(self, params={
         'companyId',
@@ -121,7 +145,7 @@ class RDN():
         'ownedBankAccNo',
         'idIssuingDate'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -176,20 +200,7 @@ class RDN():
             'ownedBankAccNo': params['ownedBankAccNo'],
             'idIssuingDate': params['idIssuingDate']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/register/investor',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'registerInvestorResponse'})
+        return self.send('/rdn/v2.1/register/investor', payload['request'], timeStamp, 'registerInvestorResponse')
     
     def checkSID(self, params={
         'companyId',
@@ -200,7 +211,7 @@ class RDN():
         'branchCode',
         'ack'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -215,20 +226,7 @@ class RDN():
             'branchCode': params['branchCode'],
             'ack': params['ack']        
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/checksid',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'checkSIDResponse'})
+        return self.send('/rdn/v2.1/checksid', payload['request'], timeStamp, 'checkSIDResponse')
     
     def registerInvestorAccount(self, params={
         'companyId',
@@ -241,7 +239,7 @@ class RDN():
         'bnisId',
         'sre'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         uuid = generateUUID()
         payload = {}
         payload['request'] = {}
@@ -259,20 +257,7 @@ class RDN():
             'bnisId': params['bnisId'],        
             'sre': params['sre'],
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/register/investor/account',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'registerInvestorAccountResponse'})
+        return self.send('/rdn/v2.1/register/investor/account', payload['request'], timeStamp, 'registerInvestorAccountResponse')
     
     def sendDataStatic(self, params={
         'companyId',
@@ -286,7 +271,7 @@ class RDN():
         'activityDate',
         'activity'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -304,27 +289,14 @@ class RDN():
             'activityDate': params['activityDate'],        
             'activity': params['activity']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/senddatastatic',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'sendDataStaticResponse'})
+        return self.send('/rdn/v2.1/senddatastatic', payload['request'], timeStamp, 'sendDataStaticResponse')
     
     def inquiryAccountInfo(self, params={
         'companyId',
         'parentCompanyId',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -335,27 +307,14 @@ class RDN():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/inquiry/account/info',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'inquiryAccountInfoResponse'})
+        return self.send('/rdn/v2.1/inquiry/account/info', payload['request'], timeStamp, 'inquiryAccountInfoResponse')
     
     def inquiryAccountBalance(self, params={
         'companyId',
         'parentCompanyId',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -366,27 +325,14 @@ class RDN():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/inquiry/account/balance',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'inquiryAccountBalanceResponse'})
+        return self.send('/rdn/v2.1/inquiry/account/balance', payload['request'], timeStamp, 'inquiryAccountBalanceResponse')
     
     def inquiryAccountHistory(self, params={
         'companyId',
         'parentCompanyId',
         'accountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -397,20 +343,7 @@ class RDN():
             },
             'accountNumber': params['accountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/inquiry/account/history',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'inquiryAccountHistoryResponse'})
+        return self.send('/rdn/v2.1/inquiry/account/history', payload['request'], timeStamp, 'inquiryAccountHistoryResponse')
     
     def paymentUsingTransfer(self, params={
         'companyId',
@@ -421,7 +354,7 @@ class RDN():
         'amount',
         'remark'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -436,27 +369,14 @@ class RDN():
             'amount': params['amount'],
             'remark': params['remark']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/payment/transfer',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'paymentUsingTransferResponse'})
+        return self.send('/rdn/v2.1/payment/transfer', payload['request'], timeStamp, 'paymentUsingTransferResponse')
     
     def inquiryPaymentStatus(self, params={
         'companyId',
         'parentCompanyId',
         'requestedUuid'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -467,20 +387,7 @@ class RDN():
             },
             'requestedUuid': params['requestedUuid']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/inquiry/payment/status',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'inquiryPaymentStatusResponse'})
+        return self.send('/rdn/v2.1/inquiry/payment/status', payload['request'], timeStamp, 'inquiryPaymentStatusResponse')
     
     def paymentUsingClearing(self, params={
         'companyId',
@@ -496,7 +403,7 @@ class RDN():
         'remark',
         'chargingType'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -516,20 +423,7 @@ class RDN():
             'remark': params['remark'],
             'chargingType': params['chargingType']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/payment/clearing',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'paymentUsingClearingResponse'})
+        return self.send('/rdn/v2.1/payment/clearing', payload['request'], timeStamp, 'paymentUsingClearingResponse')
     
     def paymentUsingRTGS(self, params={
         'companyId',
@@ -545,7 +439,7 @@ class RDN():
         'remark',
         'chargingType'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -565,20 +459,7 @@ class RDN():
             'remark': params['remark'],
             'chargingType': params['chargingType']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/payment/rtgs',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'paymentUsingRTGSResponse'})
+        return self.send('/rdn/v2.1/payment/rtgs', payload['request'], timeStamp, 'paymentUsingRTGSResponse')
         
     def inquiryInterbankAccount(self, params={
         'companyId',
@@ -587,7 +468,7 @@ class RDN():
         'beneficiaryBankCode',
         'beneficiaryAccountNumber'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -600,20 +481,7 @@ class RDN():
             'beneficiaryBankCode': params['beneficiaryBankCode'],
             'beneficiaryAccountNumber': params['beneficiaryAccountNumber']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/inquiry/interbank/account',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'inquiryInterbankAccountResponse'})
+        return self.send('/rdn/v2.1/inquiry/interbank/account', payload['request'], timeStamp, 'inquiryInterbankAccountResponse')
     
     def paymentUsingInterbank(self, params={
         'companyId',
@@ -625,7 +493,7 @@ class RDN():
         'beneficiaryBankName',
         'amount'
     }):
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         payload = {}
         payload['request'] = {}
         payload['request'] = {
@@ -641,17 +509,15 @@ class RDN():
             'beneficiaryBankName': params['beneficiaryBankName'],
             'amount': params['amount']
         }
-        payload = {**payload, **{ 'timestamp': timeStamp }}
-        signature = generateSignature(
-            {'body': payload, 'apiSecret': self.client['apiSecret']})
-        res = self.httpClient.requestV2({
-            'method': 'POST',
-            'apiKey': self.client['apiKey'],
-            'accessToken': self.token,
-            'url': f'{self.baseUrl}',
-            'path': '/rdn/v2.1/payment/interbank',
-            'signature': signature.split('.')[2],
-            'timestamp': timeStamp,
-            'data': {'request': payload['request']}
-        })
-        return responseRDN(params={'res': res, 'resObj': 'paymentUsingInterbankResponse'})
+        return self.send('/rdn/v2.1/payment/interbank', payload['request'], timeStamp, 'paymentUsingInterbankResponse')
+
+
+class AsyncRDN(RDN):
+    async def getToken(self):
+        return await self.bniClient.getToken()
+
+    async def send(self, path, request, timeStamp, resObj):
+        res = await self.httpClient.authorized(
+            self.getToken, self.bniClient.invalidateToken,
+            lambda token: self.httpClient.requestV2(self.prepare(path, request, timeStamp, token)))
+        return responseRDN(params={'res': res, 'resObj': resObj})
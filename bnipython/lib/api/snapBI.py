@@ -1,104 +1,131 @@
-from bnipython.lib.net.httpClient import HttpClient
 from bnipython.lib.util.response import responseSnapBI
-from bnipython.lib.util.utils import getTimestamp, generateSignatureServiceSnapBI, randomNumber
+from bnipython.lib.util.utils import randomNumber, encodeBody
+from bnipython.lib.util.signingKey import SigningKey
+from bnipython.lib.net.retry import SAFE, STATUS_CHECK, UNSAFE
+
+idempotency = {
+    '/snap-service/v1/balance-inquiry': SAFE,
+    '/snap-service/v1/account-inquiry-internal': SAFE,
+    '/snap-service/v1/account-inquiry-external': SAFE,
+    '/snap-service/v1/transfer/status': SAFE,
+    '/snap-service/v1/transfer-intrabank': STATUS_CHECK,
+    '/snap-service/v1/transfer-interbank': STATUS_CHECK,
+    '/snap-service/v1/transfer-rtgs': STATUS_CHECK,
+    '/snap-service/v1/transfer-skn': STATUS_CHECK
+}
+
+serviceCodes = {
+    '/snap-service/v1/transfer-intrabank': '17',
+    '/snap-service/v1/transfer-interbank': '18',
+    '/snap-service/v1/transfer-rtgs': '22',
+    '/snap-service/v1/transfer-skn': '23'
+}
 
 
 class SnapBI():
-    def __init__(self, client, options={'privateKeyPath', 'channelId', 'ipAddress', 'latitude', 'longitude'}):
+    def __init__(self, client, options={'privateKeyPath', 'privateKey', 'privateKeyPassword', 'channelId', 'ipAddress', 'latitude', 'longitude'}):
         self.client = client
         self.baseUrl = client.getBaseUrl()
         self.config = client.getConfig()
-        self.httpClient = HttpClient()
+        self.httpClient = client.httpClient
+        self.signer = client.signer
         self.configSnap = options
+        self.signingKey = SigningKey(
+            options.get('privateKey') or options.get('privateKeyPath'), options.get('privateKeyPassword'))
         self.configSnap['ipAddress'] = options.get('ipAddress', '')
         self.configSnap['latitude'] = options.get('latitude', '')
         self.configSnap['longitude'] = options.get('longitude', '')
         self.configSnap['channelId'] = options.get('channelId', '')
 
-    def getTokenSnapBI(self):
-        token = self.httpClient.tokenRequestSnapBI({
+    def tokenRequestOptions(self):
+        return {
             'url': f'{self.baseUrl}/snap/v1/access-token/b2b',
+            'path': '/snap/v1/access-token/b2b',
+            'product': 'SnapBI',
             'clientId': self.config['clientId'],
-            'privateKeyPath': self.configSnap['privateKeyPath']
-        })
-        return token['accessToken']
-
-    def balanceInquiry(self, params={
-        'partnerReferenceNo,'
-        'accountNo'
-    }):
-        token = self.getTokenSnapBI()
-        body = {
-            'partnerReferenceNo': params['partnerReferenceNo'],
-            'accountNo': params['accountNo']
+            'signingKey': self.signingKey,
+            'timeStamp': self.signer.timestamp()
         }
-        timeStamp = getTimestamp()
-        signature = generateSignatureServiceSnapBI({
-            'body': body,
-            'method': 'POST',
-            'url': '/snap-service/v1/balance-inquiry',
-            'accessToken': token,
-            'timeStamp': timeStamp,
-            'apiSecret': self.config['apiSecret']
-        })
-        res = self.httpClient.requestSnapBI({
+
+    def tokenCacheKey(self):
+        return ('snap', self.config['env'], self.config['clientId'])
+
+    def fetchTokenSnapBI(self):
+        token = self.httpClient.tokenRequestSnapBI(self.tokenRequestOptions())
+        return token['accessToken'], token.get('expiresIn')
+
+    def getTokenSnapBI(self):
+        return self.client.tokenCache.get(self.tokenCacheKey(), self.fetchTokenSnapBI)
+
+    def invalidateTokenSnapBI(self, token=None):
+        self.client.tokenCache.invalidate(self.tokenCacheKey(), token)
+
+    def prepare(self, path, body, timeStamp, token):
+        bodyBytes = encodeBody(body)
+        signature = self.signer.snapSignature('POST', path, token, bodyBytes, timeStamp)
+        externalId = randomNumber()
+        return {
             'method': 'POST',
             'apiKey': self.config['apiKey'],
             'accessToken': token,
-            'url': f'{self.baseUrl}/snap-service/v1/balance-inquiry',
-            'data': body,
+            'url': f'{self.baseUrl}{path}',
+            'path': path,
+            'product': 'SnapBI',
+            'payload': bodyBytes,
+            'idempotency': idempotency.get(path, UNSAFE),
+            'statusCheck': self.statusCheck(path, body, externalId),
             'additionalHeader': {
                 'X-SIGNATURE': signature,
                 'X-TIMESTAMP': timeStamp,
                 'X-PARTNER-ID': self.config['apiKey'],
                 'X-IP-Address': self.configSnap['ipAddress'],
                 'X-DEVICE-ID': 'bni-python/0.1.0',
-                'X-EXTERNAL-ID': randomNumber(),
+                'X-EXTERNAL-ID': externalId,
                 'CHANNEL-ID': self.configSnap['channelId'],
                 'X-LATITUDE': self.configSnap['latitude'],
                 'X-LONGITUDE': self.configSnap['longitude']
             }
+        }
+
+    def statusCheck(self, path, body, externalId):
+        if idempotency.get(path) != STATUS_CHECK:
+            return None
+        return lambda: self.transactionStatusInquiry({
+            'originalPartnerReferenceNo': body['partnerReferenceNo'],
+            'originalExternalId': externalId,
+            'serviceCode': serviceCodes[path],
+            'transactionDate': body['transactionDate'],
+            'amount': body['amount']
         })
+
+    def send(self, path, body, timeStamp):
+        res = self.httpClient.authorized(
+            self.getTokenSnapBI, self.invalidateTokenSnapBI,
+            lambda token: self.httpClient.requestSnapBI(self.prepare(path, body, timeStamp, token)))
         return responseSnapBI(params={'res': res})
 
+    def balanceInquiry(self, params={
+        'partnerReferenceNo,'
+        'accountNo'
+    }):
+        body = {
+            'partnerReferenceNo': params['partnerReferenceNo'],
+            'accountNo': params['accountNo']
+        }
+        timeStamp = self.signer.timestamp()
+        return self.send('/snap-service/v1/balance-inquiry', body, timeStamp)
+
     def internalAccountInquiry(self, params={
         'partnerReferenceNo',
         'beneficiaryAccountNo'
     }):
-        token = self.getTokenSnapBI()
         body = {
             'partnerReferenceNo': params['partnerReferenceNo'],
             'beneficiaryAccountNo': params['beneficiaryAccountNo'],
         }
 
-        timeStamp = getTimestamp()
-        signature = generateSignatureServiceSnapBI({
-            'body': body,
-            'method': 'POST',
-            'url': '/snap-service/v1/account-inquiry-internal',
-            'accessToken': token,
-            'timeStamp': timeStamp,
-            'apiSecret': self.config['apiSecret']
-        })
-        res = self.httpClient.requestSnapBI({
-            'method': 'POST',
-            'apiKey': self.config['apiKey'],
-            'accessToken': token,
-            'url': f'{self.baseUrl}/snap-service/v1/account-inquiry-internal',
-            'data': body,
-            'additionalHeader': {
-                'X-SIGNATURE': signature,
-                'X-TIMESTAMP': timeStamp,
-                'X-PARTNER-ID': self.config['apiKey'],
-                'X-IP-Address': self.configSnap['ipAddress'],
-                'X-DEVICE-ID': 'bni-python/0.1.0',
-                'X-EXTERNAL-ID': randomNumber(),
-                'CHANNEL-ID': self.configSnap['channelId'],
-                'X-LATITUDE': self.configSnap['latitude'],
-                'X-LONGITUDE': self.configSnap['longitude']
-            }
-        })
-        return responseSnapBI(params={'res': res})
+        timeStamp = self.signer.timestamp()
+        return self.send('/snap-service/v1/account-inquiry-internal', body, timeStamp)
 
     def transactionStatusInquiry(self, params={
         'originalPartnerReferenceNo',
@@ -109,9 +136,7 @@ class SnapBI():
         'amount',
         'additionalInfo'
     }):
-
-        token = self.getTokenSnapBI()
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         body = {
             'originalPartnerReferenceNo': params['originalPartnerReferenceNo'],
             'originalReferenceNo': params.get('originalReferenceNo', ''),
@@ -132,33 +157,7 @@ class SnapBI():
                     'channel': additional_info.get('channel', '')
                 }
 
-        signature = generateSignatureServiceSnapBI({
-            'body': body,
-            'method': 'POST',
-            'url': '/snap-service/v1/transfer/status',
-            'accessToken': token,
-            'timeStamp': timeStamp,
-            'apiSecret': self.config['apiSecret']
-        })
-        res = self.httpClient.requestSnapBI({
-            'method': 'POST',
-            'apiKey': self.config['apiKey'],
-            'accessToken': token,
-            'url': f'{self.baseUrl}/snap-service/v1/transfer/status',
-            'data': body,
-            'additionalHeader': {
-                'X-SIGNATURE': signature,
-                'X-TIMESTAMP': timeStamp,
-                'X-PARTNER-ID': self.config['apiKey'],
-                'X-IP-Address': self.configSnap['ipAddress'],
-                'X-DEVICE-ID': 'bni-python/0.1.0',
-                'X-EXTERNAL-ID': randomNumber(),
-                'CHANNEL-ID': self.configSnap['channelId'],
-                'X-LATITUDE': self.configSnap['latitude'],
-                'X-LONGITUDE': self.configSnap['longitude']
-            }
-        })
-        return responseSnapBI(params={'res': res})
+        return self.send('/snap-service/v1/transfer/status', body, timeStamp)
 
     def transferIntraBank(self, params={
         'partnerReferenceNo',
@@ -174,9 +173,7 @@ class SnapBI():
         'additionalInfo'
     }
     ):
-
-        token = self.getTokenSnapBI()
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         body = {
             'partnerReferenceNo': params['partnerReferenceNo'],
             'amount': {
@@ -200,33 +197,7 @@ class SnapBI():
                     'channel': additional_info.get('channel', '')
                 }
 
-        signature = generateSignatureServiceSnapBI({
-            'body': body,
-            'method': 'POST',
-            'url': '/snap-service/v1/transfer-intrabank',
-            'accessToken': token,
-            'timeStamp': timeStamp,
-            'apiSecret': self.config['apiSecret']
-        })
-        res = self.httpClient.requestSnapBI({
-            'method': 'POST',
-            'apiKey': self.config['apiKey'],
-            'accessToken': token,
-            'url': f'{self.baseUrl}/snap-service/v1/transfer-intrabank',
-            'data': body,
-            'additionalHeader': {
-                'X-SIGNATURE': signature,
-                'X-TIMESTAMP': timeStamp,
-                'X-PARTNER-ID': self.config['apiKey'],
-                'X-IP-Address': self.configSnap['ipAddress'],
-                'X-DEVICE-ID': 'bni-python/0.1.0',
-                'X-EXTERNAL-ID': randomNumber(),
-                'CHANNEL-ID': self.configSnap['channelId'],
-                'X-LATITUDE': self.configSnap['latitude'],
-                'X-LONGITUDE': self.configSnap['longitude']
-            }
-        })
-        return responseSnapBI(params={'res': res})
+        return self.send('/snap-service/v1/transfer-intrabank', body, timeStamp)
 
     def transferRTGS(self, params={
         'partnerReferenceNo',
@@ -252,9 +223,7 @@ class SnapBI():
         'transactionDate',
         'additionalInfo'
     }):
-
-        token = self.getTokenSnapBI()
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         body = {
             'partnerReferenceNo': params['partnerReferenceNo'],
             'amount': {
@@ -289,33 +258,7 @@ class SnapBI():
                     'channel': additional_info.get('channel', '')
                 }
 
-        signature = generateSignatureServiceSnapBI({
-            'body': body,
-            'method': 'POST',
-            'url': '/snap-service/v1/transfer-rtgs',
-            'accessToken': token,
-            'timeStamp': timeStamp,
-            'apiSecret': self.config['apiSecret']
-        })
-        res = self.httpClient.requestSnapBI({
-            'method': 'POST',
-            'apiKey': self.config['apiKey'],
-            'accessToken': token,
-            'url': f'{self.baseUrl}/snap-service/v1/transfer-rtgs',
-            'data': body,
-            'additionalHeader': {
-                'X-SIGNATURE': signature,
-                'X-TIMESTAMP': timeStamp,
-                'X-PARTNER-ID': self.config['apiKey'],
-                'X-IP-Address': self.configSnap['ipAddress'],
-                'X-DEVICE-ID': 'bni-python/0.1.0',
-                'X-EXTERNAL-ID': randomNumber(),
-                'CHANNEL-ID': self.configSnap['channelId'],
-                'X-LATITUDE': self.configSnap['latitude'],
-                'X-LONGITUDE': self.configSnap['longitude']
-            }
-        })
-        return responseSnapBI(params={'res': res})
+        return self.send('/snap-service/v1/transfer-rtgs', body, timeStamp)
 
     def transferSKNBI(self, params={
         'partnerReferenceNo',
@@ -341,9 +284,7 @@ class SnapBI():
         'transactionDate',
         'additionalInfo'
     }):
-
-        token = self.getTokenSnapBI()
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         body = {
             'partnerReferenceNo': params['partnerReferenceNo'],
             'amount': {
@@ -378,33 +319,7 @@ class SnapBI():
                     'channel': additional_info.get('channel', '')
                 }
 
-        signature = generateSignatureServiceSnapBI({
-            'body': body,
-            'method': 'POST',
-            'url': '/snap-service/v1/transfer-skn',
-            'accessToken': token,
-            'timeStamp': timeStamp,
-            'apiSecret': self.config['apiSecret']
-        })
-        res = self.httpClient.requestSnapBI({
-            'method': 'POST',
-            'apiKey': self.config['apiKey'],
-            'accessToken': token,
-            'url': f'{self.baseUrl}/snap-service/v1/transfer-skn',
-            'data': body,
-            'additionalHeader': {
-                'X-SIGNATURE': signature,
-                'X-TIMESTAMP': timeStamp,
-                'X-PARTNER-ID': self.config['apiKey'],
-                'X-IP-Address': self.configSnap['ipAddress'],
-                'X-DEVICE-ID': 'bni-python/0.1.0',
-                'X-EXTERNAL-ID': randomNumber(),
-                'CHANNEL-ID': self.configSnap['channelId'],
-                'X-LATITUDE': self.configSnap['latitude'],
-                'X-LONGITUDE': self.configSnap['longitude']
-            }
-        })
-        return responseSnapBI(params={'res': res})
+        return self.send('/snap-service/v1/transfer-skn', body, timeStamp)
 
     def externalAccountInquiry(self, params={
         'beneficiaryBankCode',
@@ -412,8 +327,6 @@ class SnapBI():
         'partnerReferenceNo',
         'additionalInfo'
     }):
-
-        token = self.getTokenSnapBI()
         body = {
             'beneficiaryBankCode': params['beneficiaryBankCode'],
             'beneficiaryAccountNo': params['beneficiaryAccountNo'],
@@ -427,34 +340,8 @@ class SnapBI():
                     'channel': additional_info.get('channel', '')
                 }
 
-        timeStamp = getTimestamp()
-        signature = generateSignatureServiceSnapBI({
-            'body': body,
-            'method': 'POST',
-            'url': '/snap-service/v1/account-inquiry-external',
-            'accessToken': token,
-            'timeStamp': timeStamp,
-            'apiSecret': self.config['apiSecret']
-        })
-        res = self.httpClient.requestSnapBI({
-            'method': 'POST',
-            'apiKey': self.config['apiKey'],
-            'accessToken': token,
-            'url': f'{self.baseUrl}/snap-service/v1/account-inquiry-external',
-            'data': body,
-            'additionalHeader': {
-                'X-SIGNATURE': signature,
-                'X-TIMESTAMP': timeStamp,
-                'X-PARTNER-ID': self.config['apiKey'],
-                'X-IP-Address': self.configSnap['ipAddress'],
-                'X-DEVICE-ID': 'bni-python/0.1.0',
-                'X-EXTERNAL-ID': randomNumber(),
-                'CHANNEL-ID': self.configSnap['channelId'],
-                'X-LATITUDE': self.configSnap['latitude'],
-                'X-LONGITUDE': self.configSnap['longitude']
-            }
-        })
-        return responseSnapBI(params={'res': res})
+        timeStamp = self.signer.timestamp()
+        return self.send('/snap-service/v1/account-inquiry-external', body, timeStamp)
 
     def transferInterBank(self, params={
         'partnerReferenceNo',
@@ -472,9 +359,7 @@ class SnapBI():
         'feeType',
         'additionalInfo'
     }):
-
-        token = self.getTokenSnapBI()
-        timeStamp = getTimestamp()
+        timeStamp = self.signer.timestamp()
         body = {
             'partnerReferenceNo': params['partnerReferenceNo'],
             'amount': {
@@ -501,30 +386,19 @@ class SnapBI():
                     'channel': additional_info.get('channel', '')
                 }
 
-        signature = generateSignatureServiceSnapBI({
-            'body': body,
-            'method': 'POST',
-            'url': '/snap-service/v1/transfer-interbank',
-            'accessToken': token,
-            'timeStamp': timeStamp,
-            'apiSecret': self.config['apiSecret']
-        })
-        res = self.httpClient.requestSnapBI({
-            'method': 'POST',
-            'apiKey': self.config['apiKey'],
-            'accessToken': token,
-            'url': f'{self.baseUrl}/snap-service/v1/transfer-interbank',
-            'data': body,
-            'additionalHeader': {
-                'X-SIGNATURE': signature,
-                'X-TIMESTAMP': timeStamp,
-                'X-PARTNER-ID': self.config['apiKey'],
-                'X-IP-Address': self.configSnap['ipAddress'],
-                'X-DEVICE-ID': 'bni-python/0.1.0',
-                'X-EXTERNAL-ID': randomNumber(),
-                'CHANNEL-ID': self.configSnap['channelId'],
-                'X-LATITUDE': self.configSnap['latitude'],
-                'X-LONGITUDE': self.configSnap['longitude']
-            }
-        })
+        return self.send('/snap-service/v1/transfer-interbank', body, timeStamp)
+
+
+class AsyncSnapBI(SnapBI):
+    async def fetchTokenSnapBI(self):
+        token = await self.httpClient.tokenRequestSnapBI(self.tokenRequestOptions())
+        return token['accessToken'], token.get('expiresIn')
+
+    async def getTokenSnapBI(self):
+        return await self.client.tokenCache.getAsync(self.tokenCacheKey(), self.fetchTokenSnapBI)
+
+    async def send(self, path, body, timeStamp):
+        res = await self.httpClient.authorized(
+            self.getTokenSnapBI, self.invalidateTokenSnapBI,
+            lambda token: self.httpClient.requestSnapBI(self.prepare(path, body, timeStamp, token)))
         return responseSnapBI(params={'res': res})
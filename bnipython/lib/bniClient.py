@@ -1,15 +1,140 @@
+import asyncio
+import threading
 from bnipython.lib.net.httpClient import HttpClient
+from bnipython.lib.net.asyncHttpClient import AsyncHttpClient
 from bnipython.lib.util import constants
+from bnipython.lib.net.deadline import Deadline
+from bnipython.lib.util.tokenCache import tokenCache
+from bnipython.lib.util.signer import Signer
+from bnipython.lib.api.oneGatePayment import OneGatePayment, AsyncOneGatePayment
+from bnipython.lib.api.snapBI import SnapBI, AsyncSnapBI
+from bnipython.lib.api.rdn import RDN, AsyncRDN
+from bnipython.lib.api.rdl import RDL, AsyncRDL
+from bnipython.lib.api.rdf import RDF, AsyncRDF
+from bnipython.lib.api.bniMove import BNIMove, AsyncBNIMove
 
 
 class BNIClient:
+    productClasses = {
+        'ogp': OneGatePayment,
+        'snap': SnapBI,
+        'rdn': RDN,
+        'rdl': RDL,
+        'rdf': RDF,
+        'bniMove': BNIMove
+    }
+
     def __init__(self, options={'env': False, 'appName': '', 'clientId': '', 'clientSecret': '', 'apiKey': '', 'apiSecret': ''}):
         self.config = options
-        self.httpClient = HttpClient()
+        self.httpClient = self.createHttpClient()
+        self.tokenCache = tokenCache
+        self.signer = Signer(options)
+        self.products = {}
+        self.productsLock = threading.Lock()
+        self.keepWarmStop = None
+
+    def product(self, name):
+        product = self.products.get(name)
+        if product is None:
+            with self.productsLock:
+                product = self.products.get(name)
+                if product is None:
+                    productClass = self.productClasses[name]
+                    if name == 'snap':
+                        product = productClass(self, dict(self.config.get('snap', {})))
+                    else:
+                        product = productClass(self)
+                    self.products[name] = product
+        return product
+
+    @property
+    def ogp(self):
+        return self.product('ogp')
+
+    @property
+    def snap(self):
+        return self.product('snap')
+
+    @property
+    def rdn(self):
+        return self.product('rdn')
+
+    @property
+    def rdl(self):
+        return self.product('rdl')
+
+    @property
+    def rdf(self):
+        return self.product('rdf')
+
+    @property
+    def bniMove(self):
+        return self.product('bniMove')
+
+    def httpOptions(self):
+        options = dict(self.config.get('httpOptions', {}))
+        rateLimit = options.get('rateLimit')
+        # workers sharing an api key share one quota, so they share one limiter store
+        if isinstance(rateLimit, dict) and rateLimit.get('shared') and not rateLimit.get('namespace'):
+            options['rateLimit'] = dict(rateLimit, namespace=self.config['apiKey'])
+        return options
+
+    def createHttpClient(self):
+        return HttpClient(options=self.httpOptions())
 
     def getConfig(self):
         return self.config
 
+    def deadline(self, seconds):
+        return Deadline(seconds)
+
+    def circuitStates(self):
+        if self.httpClient.circuitBreakers is None:
+            return []
+        return self.httpClient.circuitBreakers.snapshot()
+
+    def rateLimits(self):
+        if self.httpClient.rateLimiter is None:
+            return []
+        return self.httpClient.rateLimiter.snapshot()
+
+    def prefetchTokens(self):
+        self.getToken()
+        if 'snap' in self.config:
+            self.snap.getTokenSnapBI()
+
+    def warmup(self, connections=None, tokens=True):
+        opened = self.httpClient.warm(self.getBaseUrl(), connections)
+        if tokens:
+            self.prefetchTokens()
+        return opened
+
+    def keepWarmInterval(self, interval):
+        if interval is not None:
+            return interval
+        # a pool that closes idle connections after keepAliveExpiry has to be probed well within it
+        expiry = self.httpClient.keepAliveExpiry
+        return 60 if expiry is None else min(60, expiry / 2)
+
+    def keepWarm(self, interval=None, connections=None):
+        self.stopKeepWarm()
+        interval = self.keepWarmInterval(interval)
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.warmup(connections)
+                except Exception:
+                    pass
+        self.keepWarmStop = stop
+        threading.Thread(target=run, name='bnipython-keep-warm', daemon=True).start()
+
+    def stopKeepWarm(self):
+        if self.keepWarmStop is not None:
+            self.keepWarmStop.set()
+            self.keepWarmStop = None
+
     def getBaseUrl(self):
         if self.config['env'] == 'dev':
             return constants.DEV_BASE_URL
@@ -20,11 +145,83 @@ class BNIClient:
         elif self.config['env'] == 'prod':
             return constants.PRODUCTION_BASE_URL
 
-    def getToken(self):
-        token = self.httpClient.tokenRequest({
+    def tokenRequestOptions(self):
+        return {
             'url': self.getBaseUrl(),
             'path': '/api/oauth/token',
             'username': self.config['clientId'],
             'password': self.config['clientSecret']
-        })
-        return token['access_token']
+        }
+
+    def tokenCacheKey(self):
+        return ('oauth', self.config['env'], self.config['clientId'])
+
+    def fetchToken(self):
+        token = self.httpClient.tokenRequest(self.tokenRequestOptions())
+        return token['access_token'], token.get('expires_in')
+
+    def getToken(self):
+        return self.tokenCache.get(self.tokenCacheKey(), self.fetchToken)
+
+    def invalidateToken(self, token=None):
+        self.tokenCache.invalidate(self.tokenCacheKey(), token)
+
+
+class AsyncBNIClient(BNIClient):
+    productClasses = {
+        'ogp': AsyncOneGatePayment,
+        'snap': AsyncSnapBI,
+        'rdn': AsyncRDN,
+        'rdl': AsyncRDL,
+        'rdf': AsyncRDF,
+        'bniMove': AsyncBNIMove
+    }
+
+    def createHttpClient(self):
+        return AsyncHttpClient(options=self.httpOptions())
+
+    async def fetchToken(self):
+        token = await self.httpClient.tokenRequest(self.tokenRequestOptions())
+        return token['access_token'], token.get('expires_in')
+
+    async def getToken(self):
+        return await self.tokenCache.getAsync(self.tokenCacheKey(), self.fetchToken)
+
+    async def prefetchTokens(self):
+        await self.getToken()
+        if 'snap' in self.config:
+            await self.snap.getTokenSnapBI()
+
+    async def warmup(self, connections=None, tokens=True):
+        opened = await self.httpClient.warm(self.getBaseUrl(), connections)
+        if tokens:
+            await self.prefetchTokens()
+        return opened
+
+    def keepWarm(self, interval=None, connections=None):
+        self.stopKeepWarm()
+        interval = self.keepWarmInterval(interval)
+
+        async def run():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.warmup(connections)
+                except Exception:
+                    pass
+        self.keepWarmStop = asyncio.get_running_loop().create_task(run())
+
+    def stopKeepWarm(self):
+        if self.keepWarmStop is not None:
+            self.keepWarmStop.cancel()
+            self.keepWarmStop = None
+
+    async def close(self):
+        self.stopKeepWarm()
+        await self.httpClient.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,159 @@
+from bnipython.lib.net.httpClient import prepareTokenRequest, prepareRequest, prepareTokenRequestSnapBI, \
+    prepareRequestSnapBI, prepareRequestV2, prepareWarmup, isTokenRejected, rejectionBody, classifyError, resolveHost, \
+    recoveredStatus, unconfirmed
+import asyncio
+import inspect
+import time
+from bnipython.lib.util.codec import decodeResponse
+from bnipython.lib.util.response import TokenRejected
+from bnipython.lib.net.deadline import resolveTimeout
+from bnipython.lib.net.transport import http2Available
+from bnipython.lib.net.tlsConfig import createTlsConfig
+from bnipython.lib.net.circuitBreaker import createCircuitBreakers
+from bnipython.lib.net.rateLimiter import createRateLimiter
+from bnipython.lib.net.retry import createRetryPolicy
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncHttpClient():
+    def __init__(self, verify=True, options={}):
+        if httpx is None:
+            raise ImportError('AsyncHttpClient requires httpx, install it with `pip install bnipython[async]`')
+        self.verify = verify
+        self.maxConnections = options.get('maxConnections', 100)
+        self.poolMaxsize = options.get('poolMaxsize', 10)
+        self.keepAlive = options.get('keepAlive', True)
+        self.lazyResponse = options.get('lazyResponse', False)
+        self.timeout = options.get('timeout', (10, 60))
+        self.timeouts = options.get('timeouts', {})
+        self.keepAliveExpiry = options.get('keepAliveExpiry', 5.0)
+        self.http2 = options.get('http2', False) or options.get('transport') == 'http2'
+        self.tlsConfig = createTlsConfig(options.get('tls'))
+        self.retryPolicy = createRetryPolicy(options.get('retry', {}))
+        self.circuitBreakers = createCircuitBreakers(options.get('circuitBreaker', {}))
+        self.rateLimiter = createRateLimiter(options.get('rateLimit'))
+        self.session = self.createSession()
+
+    def createSession(self):
+        limits = httpx.Limits(
+            max_connections=self.maxConnections,
+            max_keepalive_connections=self.poolMaxsize if self.keepAlive else 0,
+            keepalive_expiry=self.keepAliveExpiry
+        )
+        if self.http2 and not http2Available():
+            raise ImportError('http2 requires h2, install it with `pip install bnipython[http2]`')
+        verify = self.tlsConfig.context if self.tlsConfig is not None else self.verify
+        return httpx.AsyncClient(verify=verify, limits=limits, timeout=None, http2=self.http2)
+
+    async def close(self):
+        await self.session.aclose()
+
+    async def warm(self, url, connections=None):
+        connections = connections or self.poolMaxsize
+        host, port = resolveHost(url)
+        await asyncio.get_running_loop().getaddrinfo(host, port)
+
+        async def probe():
+            await self.transmit(prepareWarmup(url))
+        results = await asyncio.gather(*[probe() for i in range(connections)], return_exceptions=True)
+        return sum(1 for result in results if not isinstance(result, BaseException))
+
+    async def transmit(self, prepared):
+        if self.rateLimiter is None:
+            return await self.transmitOnce(prepared)
+        lease = await self.rateLimiter.acquireAsync(prepared)
+        try:
+            response = await self.transmitOnce(prepared)
+        finally:
+            await self.rateLimiter.releaseAsync(lease)
+        await self.rateLimiter.observeAsync(prepared, response.status_code, response.content)
+        return response
+
+    async def transmitOnce(self, prepared):
+        connect, read = resolveTimeout(prepared, self.timeouts, self.timeout)
+        timeout = httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+        if self.circuitBreakers is None:
+            return await self.session.request(
+                prepared['method'], prepared['url'], headers=prepared['headers'], content=prepared['data'], timeout=timeout)
+        breaker = self.circuitBreakers.get(prepared)
+        breaker.acquire()
+        started = time.monotonic()
+        try:
+            response = await self.session.request(
+                prepared['method'], prepared['url'], headers=prepared['headers'], content=prepared['data'], timeout=timeout)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record(False, time.monotonic() - started)
+            raise
+        breaker.record(response.status_code < 500, time.monotonic() - started)
+        return response
+
+    async def send(self, prepared):
+        policy = self.retryPolicy
+        policy.budget.deposit()
+        attempt = 1
+        while True:
+            response, error = None, None
+            try:
+                response = await self.transmit(prepared)
+                outcome = policy.classifyStatus(response.status_code)
+            except Exception as exc:
+                outcome = classifyError(exc)
+                if outcome is None:
+                    raise
+                error = exc
+            if outcome is None:
+                if isTokenRejected(prepared, response):
+                    raise TokenRejected(prepared['accessToken'], rejectionBody(response.content))
+                return decodeResponse(response.content, self.lazyResponse)
+            retry = policy.shouldRetry(prepared, outcome, attempt)
+            statusCheck = retry and policy.needsStatusCheck(prepared, outcome)
+            delay = policy.delay(attempt, statusCheck) if retry else None
+            if delay is None:
+                if error is not None:
+                    raise error
+                return decodeResponse(response.content, self.lazyResponse)
+            await asyncio.sleep(delay)
+            if statusCheck:
+                try:
+                    status = prepared['statusCheck']()
+                    if inspect.isawaitable(status):
+                        status = await status
+                except Exception as exc:
+                    ambiguous = unconfirmed(prepared, error, response, exc)
+                    if ambiguous is not None:
+                        raise ambiguous from exc
+                else:
+                    result = recoveredStatus(prepared, status)
+                    if result is not None:
+                        return result
+            attempt += 1
+
+    async def authorized(self, getToken, invalidateToken, call):
+        token = await getToken()
+        try:
+            return await call(token)
+        except TokenRejected as exc:
+            invalidateToken(exc.token)
+            return await call(await getToken())
+
+    async def tokenRequest(self, options={'url', 'path', 'username', 'password'}):
+        return await self.send(prepareTokenRequest(options))
+
+    async def request(self, options={'method', 'apiKey', 'accessToken', 'url', 'path', 'payload'}):
+        return await self.send(prepareRequest(options))
+
+    async def tokenRequestSnapBI(self, options={'url', 'clientId', 'signingKey'}):
+        return await self.send(prepareTokenRequestSnapBI(options))
+
+    async def requestSnapBI(self, options={'method', 'apiKey', 'accessToken', 'url', 'payload', 'additionalHeader'}):
+        return await self.send(prepareRequestSnapBI(options))
+
+    async def requestV2(self, options={'method', 'apiKey', 'accessToken', 'url', 'path', 'payload', 'signature', 'timestamp'}):
+        return await self.send(prepareRequestV2(options))
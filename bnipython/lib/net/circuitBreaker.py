@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'halfOpen'
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, key, retryAfter):
+        self.key = key
+        self.retryAfter = retryAfter
+        super().__init__(f'circuit for {key[0]} {key[1]} is open, retry in {retryAfter:.1f}s')
+
+
+class CircuitBreaker():
+    def __init__(self, key, failureRateThreshold=0.5, slowCallRateThreshold=0.8, slowCallDuration=10.0,
+                 windowSize=20, minimumCalls=10, openDuration=30.0, halfOpenProbes=3, onStateChange=None):
+        self.key = key
+        self.failureRateThreshold = failureRateThreshold
+        self.slowCallRateThreshold = slowCallRateThreshold
+        self.slowCallDuration = slowCallDuration
+        self.minimumCalls = minimumCalls
+        self.openDuration = openDuration
+        self.halfOpenProbes = halfOpenProbes
+        self.onStateChange = onStateChange
+        self.calls = deque(maxlen=windowSize)
+        self.state = CLOSED
+        self.openedAt = None
+        self.probesInFlight = 0
+        self.probesSucceeded = 0
+        self.lock = threading.Lock()
+
+    def transition(self, state):
+        # called with the lock held; the caller passes the returned change to notify() once it is released
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.openedAt = time.monotonic()
+        if state != CLOSED:
+            self.probesInFlight = 0
+            self.probesSucceeded = 0
+        if state == CLOSED:
+            self.calls.clear()
+        return previous, state
+
+    def notify(self, change):
+        if change is None or self.onStateChange is None:
+            return
+        try:
+            self.onStateChange(self.key, *change)
+        except Exception:
+            # a failing listener must not fail the request that happened to trip the breaker
+            pass
+
+    def acquire(self):
+        change = None
+        try:
+            with self.lock:
+                if self.state == OPEN:
+                    waited = time.monotonic() - self.openedAt
+                    if waited < self.openDuration:
+                        raise CircuitOpenError(self.key, self.openDuration - waited)
+                    change = self.transition(HALF_OPEN)
+                if self.state == HALF_OPEN:
+                    # only a few probes go through while the endpoint proves it has recovered
+                    if self.probesInFlight + self.probesSucceeded >= self.halfOpenProbes:
+                        raise CircuitOpenError(self.key, 0.0)
+                    self.probesInFlight += 1
+        finally:
+            self.notify(change)
+
+    def release(self):
+        # an abandoned call says nothing about the endpoint, it only gives back its probe slot
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probesInFlight = max(0, self.probesInFlight - 1)
+
+    def record(self, success, elapsed):
+        with self.lock:
+            change = self.observe(success, elapsed >= self.slowCallDuration)
+        self.notify(change)
+
+    def observe(self, success, slow):
+        if self.state == HALF_OPEN:
+            self.probesInFlight = max(0, self.probesInFlight - 1)
+            if not success or slow:
+                return self.transition(OPEN)
+            self.probesSucceeded += 1
+            if self.probesSucceeded >= self.halfOpenProbes:
+                return self.transition(CLOSED)
+            return None
+        if self.state != CLOSED:
+            return None
+        self.calls.append((success, slow))
+        if len(self.calls) < self.minimumCalls:
+            return None
+        failureRate, slowRate = self.rates()
+        if failureRate >= self.failureRateThreshold or slowRate >= self.slowCallRateThreshold:
+            return self.transition(OPEN)
+        return None
+
+    def rates(self):
+        if not self.calls:
+            return 0.0, 0.0
+        failures = sum(1 for success, slow in self.calls if not success)
+        slows = sum(1 for success, slow in self.calls if slow)
+        return failures / len(self.calls), slows / len(self.calls)
+
+    def snapshot(self):
+        with self.lock:
+            failureRate, slowRate = self.rates()
+            return {
+                'product': self.key[0],
+                'path': self.key[1],
+                'state': self.state,
+                'calls': len(self.calls),
+                'failureRate': failureRate,
+                'slowCallRate': slowRate
+            }
+
+
+class CircuitBreakers():
+    def __init__(self, options={}):
+        self.options = dict(options)
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get(self, prepared):
+        key = (prepared.get('product'), prepared.get('path'))
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            with self.lock:
+                breaker = self.breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(key, **self.options)
+                    self.breakers[key] = breaker
+        return breaker
+
+    def snapshot(self):
+        return [breaker.snapshot() for breaker in list(self.breakers.values())]
+
+
+def createCircuitBreakers(options):
+    if options is False or options is None:
+        return None
+    if isinstance(options, CircuitBreakers):
+        return options
+    return CircuitBreakers(options)
@@ -0,0 +1,53 @@
+import contextvars
+import time
+
+currentDeadline = contextvars.ContextVar('bnipythonDeadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline():
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expiresAt = time.monotonic() + seconds
+        self.token = None
+
+    def remaining(self):
+        return self.expiresAt - time.monotonic()
+
+    def check(self):
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'deadline of {self.seconds}s exceeded')
+        return remaining
+
+    def __enter__(self):
+        outer = currentDeadline.get()
+        # a nested deadline can only tighten the one already in force
+        active = self if outer is None or self.expiresAt < outer.expiresAt else outer
+        self.token = currentDeadline.set(active)
+        return active
+
+    def __exit__(self, *exc):
+        currentDeadline.reset(self.token)
+        self.token = None
+
+
+def normalizeTimeout(timeout):
+    if isinstance(timeout, (tuple, list)):
+        return (timeout[0], timeout[1])
+    return (timeout, timeout)
+
+
+def resolveTimeout(prepared, timeouts={}, default=None):
+    # most specific wins: endpoint path, then product, then the client default
+    timeout = timeouts.get(prepared.get('path'), timeouts.get(prepared.get('product'), default))
+    connect, read = normalizeTimeout(timeout)
+    deadline = currentDeadline.get()
+    if deadline is not None:
+        remaining = deadline.check()
+        connect = remaining if connect is None else min(connect, remaining)
+        read = remaining if read is None else min(read, remaining)
+    return (connect, read)
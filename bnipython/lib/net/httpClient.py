@@ -1,77 +1,351 @@
 import json
 import base64
+import socket
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from urllib3.exceptions import NewConnectionError, ConnectTimeoutError, ReadTimeoutError, ProtocolError
 from bnipython.lib.util.utils import getTimestamp, generateTokenSignature
+from bnipython.lib.util.codec import decodeResponse, LazyResponse
+from bnipython.lib.net.deadline import resolveTimeout
+from bnipython.lib.net.transport import createTransport, httpx
+from bnipython.lib.net.tlsConfig import createTlsConfig
+from bnipython.lib.net.circuitBreaker import createCircuitBreakers
+from bnipython.lib.net.rateLimiter import createRateLimiter
+from bnipython.lib.net.retry import SAFE, UNSAFE, NOT_SENT, AMBIGUOUS, StatusCheckResult, AmbiguousOutcome, createRetryPolicy
+from bnipython.lib.util.response import TokenRejected
+from bnipython.lib.util.transactionStatus import NOT_FOUND, transactionState, isNotFound
 
-class HttpClient():
-    def __init__(self, verify=True):
-        self.verify = verify
 
-    def tokenRequest(self, options={'url', 'path', 'username', 'password'}):
-        url = f"{options['url']}{options['path']}"
-        username = options['username']
-        password = options['password']
-        authorize = base64.b64encode(f'{username}:{password}'.encode('utf-8')).decode()
-        headers = {
+def classifyError(exc):
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return NOT_SENT
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = exc.args[0] if exc.args else None
+        reason = getattr(reason, 'reason', reason)
+        # the connection was never established, so the gateway cannot have seen the request
+        if isinstance(reason, (NewConnectionError, ConnectTimeoutError)):
+            return NOT_SENT
+        return AMBIGUOUS
+    if isinstance(exc, requests.exceptions.Timeout):
+        return AMBIGUOUS
+    if isinstance(exc, (NewConnectionError, ConnectTimeoutError)):
+        return NOT_SENT
+    if isinstance(exc, (ReadTimeoutError, ProtocolError)):
+        return AMBIGUOUS
+    if httpx is not None:
+        if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return NOT_SENT
+        if isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+            return AMBIGUOUS
+    return None
+
+
+def isTokenRejected(prepared, response):
+    if not prepared.get('accessToken'):
+        return False
+    content = response.content or b''
+    # SNAP 401xx01 is an invalid or expired token; other 401xxxx codes, such as a bad signature, are not
+    # fixed by a new token
+    if b'"401' in content:
+        code = LazyResponse(content).peek('responseCode')
+        if isinstance(code, str) and len(code) == 7 and code.startswith('401') and code.endswith('01'):
+            return True
+    # the OAuth tokens of the other products report an expired or revoked token as invalid_token
+    if response.status_code == 401:
+        challenge = getattr(response, 'headers', {}).get('WWW-Authenticate') or ''
+        return 'invalid_token' in challenge or b'invalid_token' in content
+    return False
+
+
+def rejectionBody(content):
+    # an RFC 6750 rejection often has no body at all, only a WWW-Authenticate challenge
+    if not content:
+        return None
+    try:
+        return decodeResponse(content)
+    except ValueError:
+        return None
+
+
+def recoveredStatus(prepared, status):
+    # None means the status endpoint has no record of the payment, so it can be sent again
+    state = transactionState(prepared.get('product'), status)
+    if state == NOT_FOUND:
+        return None
+    return StatusCheckResult(status, state)
+
+
+def unconfirmed(prepared, error, response, statusError):
+    if isNotFound(prepared.get('product'), statusError):
+        return None
+    return AmbiguousOutcome(prepared.get('path'), error, response.status_code if response is not None else None,
+                            statusError)
+
+
+def resolveHost(url):
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return parts.hostname, port
+
+
+def encodePayload(options):
+    # products hand over the exact bytes they signed; plain 'data' is still accepted
+    payload = options.get('payload')
+    if payload is None:
+        payload = json.dumps(options['data'])
+    return payload
+
+
+def prepareWarmup(url):
+    # a bare HEAD on the gateway; it goes through the rate limiter and a circuit breaker of its own
+    return {
+        'method': 'HEAD',
+        'url': url,
+        'headers': {'User-Agent': 'bni-python/0.1.0'},
+        'data': None,
+        'product': 'warmup',
+        'path': urlsplit(url).path or '/',
+        'idempotency': SAFE
+    }
+
+
+def prepareTokenRequest(options={'url', 'path', 'username', 'password'}):
+    username = options['username']
+    password = options['password']
+    authorize = base64.b64encode(f'{username}:{password}'.encode('utf-8')).decode()
+    return {
+        'method': 'POST',
+        'url': f"{options['url']}{options['path']}",
+        'headers': {
             'User-Agent': 'bni-python/0.1.0',
             'Authorization': f'Basic {authorize}',
             'Content-Type': 'application/x-www-form-urlencoded'
-        }
-        payload = 'grant_type=client_credentials'
+        },
+        'data': 'grant_type=client_credentials',
+        'product': options.get('product'),
+        'path': options['path'],
+        'idempotency': SAFE
+    }
 
-        response = requests.post(url, headers=headers, data=payload, verify=self.verify)
-        return response.json()
 
-    def request(self, options={'method', 'apiKey', 'accessToken', 'url', 'path', 'data'}):
-        url = f"{options['url']}{options['path']}?access_token={options['accessToken']}"
-        headers = {
+def prepareRequest(options={'method', 'apiKey', 'accessToken', 'url', 'path', 'payload'}):
+    return {
+        'method': options['method'],
+        'url': f"{options['url']}{options['path']}?access_token={options['accessToken']}",
+        'headers': {
             'User-Agent': 'bni-python/0.1.0',
             'x-api-key': options['apiKey'],
             'Content-Type': 'application/json'
-        }
-        payload = json.dumps(options['data'])
-        response = requests.request(options['method'], url, headers=headers, data=payload, verify=self.verify)
-        return response.json()
+        },
+        'data': encodePayload(options),
+        'product': options.get('product'),
+        'path': options.get('path'),
+        'idempotency': options.get('idempotency', UNSAFE),
+        'statusCheck': options.get('statusCheck'),
+        'accessToken': options.get('accessToken')
+    }
 
-    def tokenRequestSnapBI(self, options={'url', 'clientId', 'privateKeyPath'}):
-        timeStamp = getTimestamp()
-        payload = json.dumps({
-            "grantType": "client_credentials",
-            "additionalInfo": {}
-        })
-        headers = {
+
+def prepareTokenRequestSnapBI(options={'url', 'clientId', 'signingKey', 'timeStamp'}):
+    timeStamp = options.get('timeStamp') or getTimestamp()
+    return {
+        'method': 'POST',
+        'url': options['url'],
+        'headers': {
             'Content-Type': 'application/json',
             'X-SIGNATURE': generateTokenSignature({
-                'privateKeyPath': options['privateKeyPath'],
+                'signingKey': options.get('signingKey'),
+                'privateKeyPath': options.get('privateKeyPath'),
                 'clientId': options['clientId'],
                 'timeStamp': timeStamp
             }),
             'X-TIMESTAMP': timeStamp,
             'X-CLIENT-KEY': options['clientId']
-        }
-        response = requests.post(options['url'], headers=headers, data=payload, verify=self.verify)
-        return response.json()
+        },
+        'data': json.dumps({
+            "grantType": "client_credentials",
+            "additionalInfo": {}
+        }),
+        'product': options.get('product'),
+        'path': options.get('path'),
+        'idempotency': SAFE
+    }
 
-    def requestSnapBI(self, options={'method', 'apiKey', 'accessToken', 'url', 'data', 'additionalHeader'}):
-        headers = {
-            'Content-Type': 'application/json',
-            'User-Agent': 'bni-python/0.1.0',
-            'Authorization': f'Bearer {options['accessToken']}',
-        }
-        headers.update(options['additionalHeader'])
-        payload = json.dumps(options['data'])
-        response = requests.request(options['method'], options['url'], headers=headers, data=payload, verify=self.verify)
-        return response.json()
 
-    def requestV2(self, options={'method', 'apiKey', 'accessToken', 'url', 'path', 'data', 'signature', 'timestamp'}):
-        url = f"{options['url']}{options['path']}?access_token={options['accessToken']}"
-        headers = {
+def prepareRequestSnapBI(options={'method', 'apiKey', 'accessToken', 'url', 'payload', 'additionalHeader'}):
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'bni-python/0.1.0',
+        'Authorization': f"Bearer {options['accessToken']}",
+    }
+    headers.update(options['additionalHeader'])
+    return {
+        'method': options['method'],
+        'url': options['url'],
+        'headers': headers,
+        'data': encodePayload(options),
+        'product': options.get('product'),
+        'path': options.get('path'),
+        'idempotency': options.get('idempotency', UNSAFE),
+        'statusCheck': options.get('statusCheck'),
+        'accessToken': options.get('accessToken')
+    }
+
+
+def prepareRequestV2(options={'method', 'apiKey', 'accessToken', 'url', 'path', 'payload', 'signature', 'timestamp'}):
+    return {
+        'method': options['method'],
+        'url': f"{options['url']}{options['path']}?access_token={options['accessToken']}",
+        'headers': {
             'User-Agent': 'bni-python/0.1.0',
             'x-api-key': options['apiKey'],
             'x-signature': options['signature'],
             'x-timestamp': options['timestamp'],
             'Content-Type': 'application/json'
-        }
-        payload = json.dumps(options['data'])
-        response = requests.request(options['method'], url, headers=headers, data=payload, verify=self.verify)
-        return response.json()
+        },
+        'data': encodePayload(options),
+        'product': options.get('product'),
+        'path': options.get('path'),
+        'idempotency': options.get('idempotency', UNSAFE),
+        'statusCheck': options.get('statusCheck'),
+        'accessToken': options.get('accessToken')
+    }
+
+
+class HttpClient():
+    def __init__(self, verify=True, options={}):
+        self.verify = verify
+        self.lazyResponse = options.get('lazyResponse', False)
+        self.poolMaxsize = options.get('poolMaxsize', 10)
+        self.timeout = options.get('timeout', (10, 60))
+        self.timeouts = options.get('timeouts', {})
+        self.retryPolicy = createRetryPolicy(options.get('retry', {}))
+        self.circuitBreakers = createCircuitBreakers(options.get('circuitBreaker', {}))
+        self.rateLimiter = createRateLimiter(options.get('rateLimit'))
+        self.tlsConfig = createTlsConfig(options.get('tls'))
+        self.transport = createTransport(options.get('transport', 'requests'), verify, options, self.tlsConfig)
+
+    @property
+    def session(self):
+        return getattr(self.transport, 'session', None)
+
+    @property
+    def keepAliveExpiry(self):
+        # only the httpx based transports close idle pooled connections on their own
+        return getattr(self.transport, 'keepAliveExpiry', None)
+
+    def close(self):
+        self.transport.close()
+
+    def warm(self, url, connections=None):
+        connections = connections or self.poolMaxsize
+        host, port = resolveHost(url)
+        socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        timeout = resolveTimeout({}, {}, self.timeout)
+        # start every probe together so each one has to open its own pooled connection
+        barrier = threading.Barrier(connections)
+
+        def probe(index):
+            try:
+                barrier.wait(timeout[0])
+                self.transmit(prepareWarmup(url))
+                return True
+            except Exception:
+                return False
+        with ThreadPoolExecutor(connections) as pool:
+            return sum(pool.map(probe, range(connections)))
+
+    def transmit(self, prepared):
+        if self.rateLimiter is None:
+            return self.transmitOnce(prepared)
+        lease = self.rateLimiter.acquire(prepared)
+        try:
+            response = self.transmitOnce(prepared)
+        finally:
+            self.rateLimiter.release(lease)
+        self.rateLimiter.observe(prepared, response.status_code, response.content)
+        return response
+
+    def transmitOnce(self, prepared):
+        timeout = resolveTimeout(prepared, self.timeouts, self.timeout)
+        if self.circuitBreakers is None:
+            return self.transport.request(
+                prepared['method'], prepared['url'], prepared['headers'], prepared['data'], timeout)
+        breaker = self.circuitBreakers.get(prepared)
+        breaker.acquire()
+        started = time.monotonic()
+        try:
+            response = self.transport.request(
+                prepared['method'], prepared['url'], prepared['headers'], prepared['data'], timeout)
+        except Exception:
+            breaker.record(False, time.monotonic() - started)
+            raise
+        breaker.record(response.status_code < 500, time.monotonic() - started)
+        return response
+
+    def send(self, prepared):
+        policy = self.retryPolicy
+        policy.budget.deposit()
+        attempt = 1
+        while True:
+            response, error = None, None
+            try:
+                response = self.transmit(prepared)
+                outcome = policy.classifyStatus(response.status_code)
+            except Exception as exc:
+                outcome = classifyError(exc)
+                if outcome is None:
+                    raise
+                error = exc
+            if outcome is None:
+                if isTokenRejected(prepared, response):
+                    raise TokenRejected(prepared['accessToken'], rejectionBody(response.content))
+                return decodeResponse(response.content, self.lazyResponse)
+            retry = policy.shouldRetry(prepared, outcome, attempt)
+            statusCheck = retry and policy.needsStatusCheck(prepared, outcome)
+            delay = policy.delay(attempt, statusCheck) if retry else None
+            if delay is None:
+                if error is not None:
+                    raise error
+                return decodeResponse(response.content, self.lazyResponse)
+            time.sleep(delay)
+            if statusCheck:
+                # the payment may have gone through: ask the status endpoint before replaying it
+                try:
+                    status = prepared['statusCheck']()
+                except Exception as exc:
+                    ambiguous = unconfirmed(prepared, error, response, exc)
+                    if ambiguous is not None:
+                        raise ambiguous from exc
+                else:
+                    result = recoveredStatus(prepared, status)
+                    if result is not None:
+                        return result
+            attempt += 1
+
+    def authorized(self, getToken, invalidateToken, call):
+        token = getToken()
+        try:
+            return call(token)
+        except TokenRejected as exc:
+            # the gateway refused the request before processing it, so one replay with a fresh token is safe
+            invalidateToken(exc.token)
+            return call(getToken())
+
+    def tokenRequest(self, options={'url', 'path', 'username', 'password'}):
+        return self.send(prepareTokenRequest(options))
+
+    def request(self, options={'method', 'apiKey', 'accessToken', 'url', 'path', 'payload'}):
+        return self.send(prepareRequest(options))
+
+    def tokenRequestSnapBI(self, options={'url', 'clientId', 'signingKey'}):
+        return self.send(prepareTokenRequestSnapBI(options))
+
+    def requestSnapBI(self, options={'method', 'apiKey', 'accessToken', 'url', 'payload', 'additionalHeader'}):
+        return self.send(prepareRequestSnapBI(options))
+
+    def requestV2(self, options={'method', 'apiKey', 'accessToken', 'url', 'path', 'payload', 'signature', 'timestamp'}):
+        return self.send(prepareRequestV2(options))
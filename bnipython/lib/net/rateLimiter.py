@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from bnipython.lib.net.deadline import currentDeadline
+from bnipython.lib.util.codec import LazyResponse
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, key, retryAfter):
+        self.key = key
+        self.retryAfter = retryAfter
+        super().__init__(f'rate limit for {key} exceeded, retry in {retryAfter:.2f}s')
+
+
+class TokenBucket():
+    def __init__(self, key, rate, burst=None, minRate=None, decrease=0.5, recovery=0.05):
+        self.key = key
+        self.baseRate = float(rate)
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.minRate = minRate if minRate is not None else self.baseRate / 20
+        self.decrease = decrease
+        self.recovery = recovery
+        self.tokens = self.burst
+        self.updatedAt = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updatedAt) * self.rate)
+        self.updatedAt = now
+
+    def reserve(self, maxWait=None):
+        # take a token now, possibly on credit; the caller waits until the debt is paid off
+        with self.lock:
+            self.refill(time.monotonic())
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if maxWait is not None and wait > maxWait:
+                raise RateLimitExceeded(self.key, wait)
+            self.tokens -= 1
+            return wait
+
+    def refund(self):
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def throttled(self):
+        with self.lock:
+            self.refill(time.monotonic())
+            self.rate = max(self.minRate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self):
+        if self.rate >= self.baseRate:
+            return
+        with self.lock:
+            self.refill(time.monotonic())
+            self.rate = min(self.baseRate, self.rate + self.baseRate * self.recovery)
+
+    def snapshot(self):
+        with self.lock:
+            return {'key': self.key, 'rate': self.rate, 'baseRate': self.baseRate, 'tokens': self.tokens}
+
+
+def isThrottled(statusCode, content):
+    if statusCode == 429:
+        return True
+    # SNAP reports throttling in the body as 429xxxx, sometimes behind a non-429 status
+    if content and b'"429' in content:
+        code = LazyResponse(content).peek('responseCode')
+        return isinstance(code, str) and code.startswith('429')
+    return False
+
+
+class RateLimiter():
+    def __init__(self, options={}):
+        self.block = options.get('block', True)
+        self.maxWait = options.get('maxWait')
+        self.buckets = {}
+        for key, limit in options.get('limits', {}).items():
+            if not isinstance(limit, dict):
+                limit = {'rate': limit}
+            self.buckets[key] = TokenBucket(key, **limit)
+
+    def bucketsFor(self, prepared):
+        return [self.buckets[key] for key in (prepared.get('path'), prepared.get('product')) if key in self.buckets]
+
+    def waitBudget(self):
+        maxWait = 0.0 if not self.block else self.maxWait
+        deadline = currentDeadline.get()
+        if deadline is not None:
+            remaining = deadline.remaining()
+            maxWait = remaining if maxWait is None else min(maxWait, remaining)
+        return maxWait
+
+    def reserve(self, prepared):
+        buckets = self.bucketsFor(prepared)
+        if not buckets:
+            return 0.0
+        maxWait = self.waitBudget()
+        reserved = []
+        try:
+            for bucket in buckets:
+                reserved.append((bucket, bucket.reserve(maxWait)))
+        except RateLimitExceeded:
+            for bucket, wait in reserved:
+                bucket.refund()
+            raise
+        return max(wait for bucket, wait in reserved)
+
+    def acquire(self, prepared):
+        wait = self.reserve(prepared)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquireAsync(self, prepared):
+        wait = self.reserve(prepared)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def release(self, lease):
+        pass
+
+    async def releaseAsync(self, lease):
+        self.release(lease)
+
+    def observe(self, prepared, statusCode, content):
+        buckets = self.bucketsFor(prepared)
+        if not buckets:
+            return
+        throttled = isThrottled(statusCode, content)
+        for bucket in buckets:
+            if throttled:
+                bucket.throttled()
+            else:
+                bucket.succeeded()
+
+    async def observeAsync(self, prepared, statusCode, content):
+        self.observe(prepared, statusCode, content)
+
+    def snapshot(self):
+        return [bucket.snapshot() for bucket in self.buckets.values()]
+
+
+def createRateLimiter(options):
+    if not options:
+        return None
+    if isinstance(options, RateLimiter):
+        return options
+    if options.get('shared'):
+        from bnipython.lib.net.sharedRateLimiter import SharedRateLimiter
+        return SharedRateLimiter(options)
+    return RateLimiter(options)
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from collections.abc import Mapping
+from bnipython.lib.net.deadline import currentDeadline
+
+# how a request may be replayed after it possibly reached the gateway
+SAFE = 'safe'
+STATUS_CHECK = 'statusCheck'
+UNSAFE = 'unsafe'
+
+# what is known about a failed attempt
+NOT_SENT = 'notSent'
+AMBIGUOUS = 'ambiguous'
+
+
+class StatusCheckResult(Mapping):
+    # the outcome of an ambiguous attempt, recovered from the status endpoint instead of a replay; it reads
+    # like the status response, and state says what that response reports about the transaction
+    def __init__(self, response, state=None):
+        self.response = response
+        self.state = state
+
+    def __getitem__(self, key):
+        return self.response[key]
+
+    def __iter__(self):
+        return iter(self.response)
+
+    def __len__(self):
+        return len(self.response)
+
+    def __repr__(self):
+        return f'StatusCheckResult({self.state}, {self.response!r})'
+
+
+class AmbiguousOutcome(Exception):
+    # the request may have been processed and its status could not be confirmed, so it was not replayed
+    def __init__(self, path, error=None, statusCode=None, statusError=None):
+        self.path = path
+        self.error = error
+        self.statusCode = statusCode
+        self.statusError = statusError
+        cause = error if error is not None else f'HTTP {statusCode}'
+        super().__init__(f'{path} may have been processed ({cause}) and its status check failed: {statusError}')
+
+
+class RetryBudget():
+    def __init__(self, ratio=0.2, minPerSecond=1.0, maxBalance=20.0):
+        self.ratio = ratio
+        self.minPerSecond = minPerSecond
+        self.maxBalance = maxBalance
+        self.balance = maxBalance
+        self.updatedAt = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.balance = min(self.maxBalance, self.balance + (now - self.updatedAt) * self.minPerSecond)
+        self.updatedAt = now
+
+    def deposit(self):
+        # every first attempt earns a fraction of a retry, so retries stay a bounded share of traffic
+        with self.lock:
+            self.refill()
+            self.balance = min(self.maxBalance, self.balance + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            self.refill()
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class RetryPolicy():
+    def __init__(self, maxAttempts=3, backoffBase=0.2, backoffMax=5.0, jitter=True,
+                 retryStatuses=(429, 502, 503, 504), budget=None, statusCheckDelay=1.0):
+        self.maxAttempts = maxAttempts
+        self.backoffBase = backoffBase
+        self.backoffMax = backoffMax
+        self.jitter = jitter
+        self.retryStatuses = retryStatuses
+        self.budget = budget or RetryBudget()
+        self.statusCheckDelay = statusCheckDelay
+
+    def classifyStatus(self, statusCode):
+        if statusCode not in self.retryStatuses:
+            return None
+        # a throttled request was rejected before processing, anything else may have been processed
+        return NOT_SENT if statusCode == 429 else AMBIGUOUS
+
+    def backoff(self, attempt):
+        delay = min(self.backoffMax, self.backoffBase * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def shouldRetry(self, prepared, outcome, attempt):
+        if outcome is None or attempt >= self.maxAttempts:
+            return False
+        if outcome == AMBIGUOUS and prepared.get('idempotency', UNSAFE) == UNSAFE:
+            return False
+        return self.budget.withdraw()
+
+    def needsStatusCheck(self, prepared, outcome):
+        return outcome == AMBIGUOUS and prepared.get('idempotency') == STATUS_CHECK \
+            and prepared.get('statusCheck') is not None
+
+    def delay(self, attempt, statusCheck=False):
+        delay = self.backoff(attempt)
+        if statusCheck:
+            # a payment still in flight at the gateway reads as not found, so let it settle before asking
+            delay = max(delay, self.statusCheckDelay)
+        deadline = currentDeadline.get()
+        if deadline is not None and deadline.remaining() <= delay:
+            return None
+        return delay
+
+
+def pathIdempotency(path):
+    # the RDN, RDL and RDF p2p paths name what they do: inquiries are reads, payments have a status endpoint
+    if '/inquiry/' in path or path.endswith('/checksid'):
+        return SAFE
+    if '/payment/' in path:
+        return STATUS_CHECK
+    return UNSAFE
+
+
+def createRetryPolicy(options):
+    if options is False or options is None:
+        return RetryPolicy(maxAttempts=1)
+    if isinstance(options, RetryPolicy):
+        return options
+    budget = RetryBudget(
+        ratio=options.get('budgetRatio', 0.2),
+        minPerSecond=options.get('budgetMinPerSecond', 1.0)
+    )
+    return RetryPolicy(
+        maxAttempts=options.get('maxAttempts', 3),
+        backoffBase=options.get('backoffBase', 0.2),
+        backoffMax=options.get('backoffMax', 5.0),
+        jitter=options.get('jitter', True),
+        retryStatuses=tuple(options.get('retryStatuses', (429, 502, 503, 504))),
+        budget=budget,
+        statusCheckDelay=options.get('statusCheckDelay', 1.0)
+    )
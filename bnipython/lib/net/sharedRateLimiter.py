@@ -0,0 +1,213 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import os
+import tempfile
+import time
+from bnipython.lib.net.rateLimiter import RateLimiter, RateLimitExceeded, isThrottled
+from bnipython.lib.util.sqliteConnections import SqliteConnections
+
+
+def sharedStorePath(namespace):
+    digest = hashlib.sha256(str(namespace).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f'bnipython-ratelimit-{digest}.sqlite')
+
+
+def processAlive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedRateLimiter(RateLimiter):
+    def __init__(self, options={}):
+        super().__init__(options)
+        self.path = options.get('path') or sharedStorePath(options.get('namespace', 'default'))
+        self.maxInFlight = options.get('maxInFlight')
+        self.leaseTimeout = options.get('leaseTimeout', 120.0)
+        self.pollInterval = options.get('pollInterval', 0.01)
+        self.knownRates = {}
+        self.connections = SqliteConnections(self.path, ('synchronous=NORMAL',))
+        self.setup()
+
+    def connection(self):
+        return self.connections.get()
+
+    def setup(self):
+        conn = self.connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updatedAt REAL, rate REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS leases (id INTEGER PRIMARY KEY AUTOINCREMENT, pid INTEGER, expiresAt REAL)')
+
+    def transaction(self, work):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    def loadBucket(self, conn, bucket, now):
+        row = conn.execute('SELECT tokens, updatedAt, rate FROM buckets WHERE key = ?', (bucket.key,)).fetchone()
+        if row is None:
+            return bucket.burst, bucket.baseRate
+        tokens, updatedAt, rate = row
+        return min(bucket.burst, tokens + max(0.0, now - updatedAt) * rate), rate
+
+    def saveBucket(self, conn, bucket, tokens, rate, now):
+        conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updatedAt, rate) VALUES (?, ?, ?, ?)',
+                     (bucket.key, tokens, now, rate))
+        self.knownRates[bucket.key] = rate
+
+    def reserve(self, prepared):
+        buckets = self.bucketsFor(prepared)
+        if not buckets:
+            return 0.0
+        maxWait = self.waitBudget()
+
+        def work(conn):
+            now = time.time()
+            waits = []
+            for bucket in buckets:
+                tokens, rate = self.loadBucket(conn, bucket, now)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+                if maxWait is not None and wait > maxWait:
+                    raise RateLimitExceeded(bucket.key, wait)
+                waits.append((bucket, tokens - 1, rate, wait))
+            for bucket, tokens, rate, wait in waits:
+                self.saveBucket(conn, bucket, tokens, rate, now)
+            return max(wait for bucket, tokens, rate, wait in waits)
+        return self.transaction(work)
+
+    def claimLease(self, conn, now):
+        conn.execute('DELETE FROM leases WHERE expiresAt < ?', (now,))
+        count = conn.execute('SELECT COUNT(*) FROM leases').fetchone()[0]
+        if count >= self.maxInFlight:
+            # leases of workers that died mid-request are reclaimed before giving up
+            pids = [row[0] for row in conn.execute('SELECT DISTINCT pid FROM leases')]
+            dead = [pid for pid in pids if not processAlive(pid)]
+            if not dead:
+                return None
+            conn.executemany('DELETE FROM leases WHERE pid = ?', [(pid,) for pid in dead])
+            count = conn.execute('SELECT COUNT(*) FROM leases').fetchone()[0]
+            if count >= self.maxInFlight:
+                return None
+        cursor = conn.execute('INSERT INTO leases (pid, expiresAt) VALUES (?, ?)', (os.getpid(), now + self.leaseTimeout))
+        return cursor.lastrowid
+
+    def enter(self, refund=()):
+        def work(conn):
+            now = time.time()
+            lease = self.claimLease(conn, now)
+            if lease is None:
+                # a request the cap turns away for good gives back the rate tokens it reserved
+                for bucket in refund:
+                    tokens, rate = self.loadBucket(conn, bucket, now)
+                    self.saveBucket(conn, bucket, min(bucket.burst, tokens + 1), rate, now)
+            return lease
+        return self.transaction(work)
+
+    def outOfTime(self, waited):
+        maxWait = self.waitBudget()
+        return maxWait is not None and waited >= maxWait
+
+    def inFlightWait(self, waited):
+        return min(self.pollInterval * 10, self.pollInterval * (1 + waited * 10))
+
+    def acquire(self, prepared):
+        wait = self.reserve(prepared)
+        if wait > 0:
+            time.sleep(wait)
+        if self.maxInFlight is None:
+            return None
+        buckets = self.bucketsFor(prepared)
+        started = time.monotonic()
+        while True:
+            waited = time.monotonic() - started
+            last = self.outOfTime(waited)
+            lease = self.enter(buckets if last else ())
+            if lease is not None:
+                return lease
+            if last:
+                raise RateLimitExceeded('inFlight', self.pollInterval)
+            time.sleep(self.inFlightWait(waited))
+
+    async def offload(self, work, *args):
+        # sqlite blocks, so the async path runs it in the default executor, under the caller's deadline
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, work, *args))
+
+    async def acquireAsync(self, prepared):
+        wait = await self.offload(self.reserve, prepared)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if self.maxInFlight is None:
+            return None
+        buckets = self.bucketsFor(prepared)
+        started = time.monotonic()
+        while True:
+            waited = time.monotonic() - started
+            last = self.outOfTime(waited)
+            lease = await self.offload(self.enter, buckets if last else ())
+            if lease is not None:
+                return lease
+            if last:
+                raise RateLimitExceeded('inFlight', self.pollInterval)
+            await asyncio.sleep(self.inFlightWait(waited))
+
+    def release(self, lease):
+        if lease is None:
+            return
+        self.transaction(lambda conn: conn.execute('DELETE FROM leases WHERE id = ?', (lease,)))
+
+    async def releaseAsync(self, lease):
+        if lease is not None:
+            await self.offload(self.release, lease)
+
+    def observed(self, prepared, statusCode, content):
+        throttled = isThrottled(statusCode, content)
+        # a success only needs a write while some process is still recovering from a throttle
+        return throttled, [bucket for bucket in self.bucketsFor(prepared)
+                           if throttled or self.knownRates.get(bucket.key, bucket.baseRate) < bucket.baseRate]
+
+    def adjust(self, buckets, throttled):
+        def work(conn):
+            now = time.time()
+            for bucket in buckets:
+                tokens, rate = self.loadBucket(conn, bucket, now)
+                if throttled:
+                    rate = max(bucket.minRate, rate * bucket.decrease)
+                    tokens = min(tokens, 0.0)
+                else:
+                    rate = min(bucket.baseRate, rate + bucket.baseRate * bucket.recovery)
+                self.saveBucket(conn, bucket, tokens, rate, now)
+        self.transaction(work)
+
+    def observe(self, prepared, statusCode, content):
+        throttled, buckets = self.observed(prepared, statusCode, content)
+        if buckets:
+            self.adjust(buckets, throttled)
+
+    async def observeAsync(self, prepared, statusCode, content):
+        throttled, buckets = self.observed(prepared, statusCode, content)
+        if buckets:
+            await self.offload(self.adjust, buckets, throttled)
+
+    def snapshot(self):
+        conn = self.connection()
+        now = time.time()
+        result = []
+        for bucket in self.buckets.values():
+            tokens, rate = self.loadBucket(conn, bucket, now)
+            result.append({'key': bucket.key, 'rate': rate, 'baseRate': bucket.baseRate, 'tokens': tokens})
+        if self.maxInFlight is not None:
+            inFlight = conn.execute('SELECT COUNT(*) FROM leases WHERE expiresAt >= ?', (now,)).fetchone()[0]
+            result.append({'key': 'inFlight', 'inFlight': inFlight, 'maxInFlight': self.maxInFlight})
+        return result
@@ -0,0 +1,137 @@
+import ssl
+import threading
+import weakref
+
+try:
+    import certifi
+except ImportError:
+    certifi = None
+
+
+class ResumingSSLSocket(ssl.SSLSocket):
+    def do_handshake(self, block=False):
+        super().do_handshake(block)
+        self.context.handshaken(self)
+
+    def close(self):
+        # TLS 1.3 tickets arrive after the handshake, so the session worth keeping is the one held at close time
+        if not self.server_side and self.server_hostname:
+            self.context.keepSession(self.server_hostname, self)
+        super().close()
+
+
+class ResumingSSLObject(ssl.SSLObject):
+    # asyncio and httpcore drive the handshake through a memory BIO and call this until it stops raising
+    # SSLWantReadError, so only the call that completes it is counted
+    def do_handshake(self):
+        super().do_handshake()
+        self.context.handshaken(self)
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    # urllib3 and httpcore never pass a session when they wrap a socket, so the context offers the
+    # last one it saw for the same host and reconnects can resume instead of doing a full handshake
+
+    sslsocket_class = ResumingSSLSocket
+    sslobject_class = ResumingSSLObject
+
+    def setupResumption(self):
+        self.sessionLock = threading.Lock()
+        self.sessions = {}
+        self.lastConnections = {}
+        self.handshakes = 0
+        self.resumed = 0
+
+    def keepSession(self, host, conn):
+        try:
+            session = conn.session
+        except (ValueError, AttributeError, OSError):
+            return
+        if session is not None and getattr(session, 'has_ticket', True):
+            with self.sessionLock:
+                self.sessions[host] = session
+
+    def resumableSession(self, host):
+        ref = self.lastConnections.get(host)
+        conn = ref() if ref is not None else None
+        if conn is not None:
+            self.keepSession(host, conn)
+        with self.sessionLock:
+            return self.sessions.get(host)
+
+    def remember(self, host, conn):
+        with self.sessionLock:
+            self.lastConnections[host] = weakref.ref(conn)
+
+    def handshaken(self, conn):
+        if conn.server_side or not conn.server_hostname:
+            return
+        with self.sessionLock:
+            self.handshakes += 1
+            self.resumed += 1 if conn.session_reused else 0
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, suppress_ragged_eofs=True,
+                    server_hostname=None, session=None):
+        if session is None and not server_side and server_hostname:
+            session = self.resumableSession(server_hostname)
+        conn = super().wrap_socket(sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+                                   suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname,
+                                   session=session)
+        if not server_side and server_hostname:
+            self.remember(server_hostname, conn)
+        return conn
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None and not server_side and server_hostname:
+            session = self.resumableSession(server_hostname)
+        conn = super().wrap_bio(incoming, outgoing, server_side=server_side, server_hostname=server_hostname,
+                                session=session)
+        if not server_side and server_hostname:
+            self.remember(server_hostname, conn)
+        return conn
+
+
+class TlsConfig():
+    def __init__(self, cafile=None, capath=None, cadata=None, certfile=None, keyfile=None, keyPassword=None,
+                 verify=True, sessionResumption=True, minimumVersion=ssl.TLSVersion.TLSv1_2):
+        self.cafile = cafile
+        self.capath = capath
+        self.cadata = cadata
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.keyPassword = keyPassword
+        self.verify = verify
+        self.sessionResumption = sessionResumption
+        self.minimumVersion = minimumVersion
+        self.context = self.createContext()
+
+    def createContext(self):
+        contextClass = ResumingSSLContext if self.sessionResumption else ssl.SSLContext
+        context = contextClass(ssl.PROTOCOL_TLS_CLIENT)
+        if self.sessionResumption:
+            context.setupResumption()
+        if self.minimumVersion is not None:
+            context.minimum_version = self.minimumVersion
+        if not self.verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        elif self.cafile or self.capath or self.cadata:
+            context.load_verify_locations(cafile=self.cafile, capath=self.capath, cadata=self.cadata)
+        elif certifi is not None:
+            context.load_verify_locations(cafile=certifi.where())
+        else:
+            context.load_default_certs()
+        if self.certfile:
+            context.load_cert_chain(self.certfile, self.keyfile, self.keyPassword)
+        return context
+
+    def stats(self):
+        if not self.sessionResumption:
+            return {}
+        return {'handshakes': self.context.handshakes, 'resumed': self.context.resumed}
+
+
+def createTlsConfig(options):
+    if options is None or isinstance(options, TlsConfig):
+        return options
+    return TlsConfig(**options)
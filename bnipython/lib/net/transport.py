@@ -0,0 +1,178 @@
+import socket
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+try:
+    import certifi
+except ImportError:
+    certifi = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def http2Available():
+    if httpx is None:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def keepAliveSocketOptions():
+    # probe idle pooled sockets so NAT/LB idle timers do not drop them silently
+    return HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+class PooledAdapter(HTTPAdapter):
+    __attrs__ = HTTPAdapter.__attrs__ + ['keepAlive']
+
+    def __init__(self, keepAlive=True, sslContext=None, **kwargs):
+        self.keepAlive = keepAlive
+        self.sslContext = sslContext
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keepAlive:
+            kwargs['socket_options'] = keepAliveSocketOptions()
+        if getattr(self, 'sslContext', None) is not None:
+            kwargs['ssl_context'] = self.sslContext
+        super().init_poolmanager(*args, **kwargs)
+
+    def cert_verify(self, conn, url, verify, cert):
+        if getattr(self, 'sslContext', None) is None:
+            return super().cert_verify(conn, url, verify, cert)
+        # the shared context already holds the trust store, loading the CA bundle again per connection is what it avoids
+        conn.cert_reqs = 'CERT_REQUIRED' if verify else 'CERT_NONE'
+
+
+class TransportResponse():
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+
+class RequestsTransport():
+    name = 'requests'
+
+    def __init__(self, verify=True, options={}, tlsConfig=None):
+        self.tlsConfig = tlsConfig
+        self.verify = tlsConfig.verify if tlsConfig is not None else verify
+        self.poolConnections = options.get('poolConnections', 10)
+        self.poolMaxsize = options.get('poolMaxsize', 10)
+        self.poolBlock = options.get('poolBlock', False)
+        self.keepAlive = options.get('keepAlive', True)
+        self.session = self.createSession()
+
+    def createSession(self):
+        session = requests.Session()
+        adapter = PooledAdapter(
+            keepAlive=self.keepAlive,
+            sslContext=self.tlsConfig.context if self.tlsConfig is not None else None,
+            pool_connections=self.poolConnections,
+            pool_maxsize=self.poolMaxsize,
+            pool_block=self.poolBlock
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.verify = self.verify
+        if not self.keepAlive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def request(self, method, url, headers, body, timeout):
+        return self.session.request(method, url, headers=headers, data=body, verify=self.verify, timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport():
+    name = 'urllib3'
+
+    def __init__(self, verify=True, options={}, tlsConfig=None):
+        self.verify = tlsConfig.verify if tlsConfig is not None else verify
+        self.keepAlive = options.get('keepAlive', True)
+        # the headers requests would add, built once instead of merged on every call
+        self.baseHeaders = {'Accept-Encoding': 'gzip, deflate', 'Accept': '*/*'}
+        if not self.keepAlive:
+            self.baseHeaders['Connection'] = 'close'
+        poolOptions = {
+            'num_pools': options.get('poolConnections', 10),
+            'maxsize': options.get('poolMaxsize', 10),
+            'block': options.get('poolBlock', False),
+            'retries': False
+        }
+        if self.keepAlive:
+            poolOptions['socket_options'] = keepAliveSocketOptions()
+        if tlsConfig is not None:
+            poolOptions['ssl_context'] = tlsConfig.context
+            poolOptions['cert_reqs'] = 'CERT_REQUIRED' if tlsConfig.verify else 'CERT_NONE'
+        elif verify is False:
+            poolOptions['cert_reqs'] = 'CERT_NONE'
+        else:
+            poolOptions['cert_reqs'] = 'CERT_REQUIRED'
+            caCerts = verify if isinstance(verify, str) else (certifi.where() if certifi is not None else None)
+            if caCerts is not None:
+                poolOptions['ca_certs'] = caCerts
+        self.pool = urllib3.PoolManager(**poolOptions)
+
+    def request(self, method, url, headers, body, timeout):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        response = self.pool.urlopen(
+            method, url, body=body, headers={**self.baseHeaders, **headers},
+            timeout=urllib3.Timeout(connect=timeout[0], read=timeout[1]),
+            retries=False, redirect=False, preload_content=True)
+        return TransportResponse(response.status, response.data, response.headers)
+
+    def close(self):
+        self.pool.clear()
+
+
+class Http2Transport():
+    name = 'http2'
+
+    def __init__(self, verify=True, options={}, tlsConfig=None):
+        if not http2Available():
+            raise ImportError('the http2 transport requires httpx and h2, install them with `pip install bnipython[http2]`')
+        self.verify = verify
+        self.keepAlive = options.get('keepAlive', True)
+        self.keepAliveExpiry = options.get('keepAliveExpiry', 5.0)
+        # each connection carries many concurrent streams, so a handful of them is enough
+        limits = httpx.Limits(
+            max_connections=options.get('poolMaxsize', 10),
+            max_keepalive_connections=options.get('poolMaxsize', 10) if self.keepAlive else 0,
+            keepalive_expiry=self.keepAliveExpiry
+        )
+        if tlsConfig is not None:
+            verify = tlsConfig.context
+        self.client = httpx.Client(http2=True, verify=verify, limits=limits, timeout=None)
+
+    def request(self, method, url, headers, body, timeout):
+        connect, read = timeout
+        response = self.client.request(
+            method, url, headers=headers, content=body,
+            timeout=httpx.Timeout(connect=connect, read=read, write=read, pool=connect))
+        return TransportResponse(response.status_code, response.content, response.headers)
+
+    def close(self):
+        self.client.close()
+
+
+transports = {'requests': RequestsTransport, 'urllib3': Urllib3Transport, 'http2': Http2Transport}
+
+
+def createTransport(transport, verify=True, options={}, tlsConfig=None):
+    if not isinstance(transport, str):
+        return transport
+    if transport not in transports:
+        raise ValueError(f'Unknown transport {transport}, available: {", ".join(transports)}')
+    return transports[transport](verify, options, tlsConfig)
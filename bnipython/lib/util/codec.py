@@ -0,0 +1,110 @@
+import json
+import re
+from collections.abc import Mapping
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+plainTypes = (str, int, bool, type(None))
+
+
+def orjsonSafe(obj):
+    # orjson writes floats differently (1e16, nan as null) and encodes dates, uuids and subclasses that json
+    # refuses or writes another way, so only exact strings, ints, bools, lists and dicts go through it
+    kind = type(obj)
+    if kind is dict:
+        return all(type(key) is str and orjsonSafe(value) for key, value in obj.items())
+    if kind is list or kind is tuple:
+        return all(orjsonSafe(item) for item in obj)
+    return kind in plainTypes
+
+
+class JsonCodec():
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def dumps(self, obj):
+        if not orjsonSafe(obj):
+            return super().dumps(obj)
+        try:
+            out = orjson.dumps(obj)
+        except TypeError:
+            return super().dumps(obj)
+        # signed bodies must match the stdlib encoding, which escapes non-ascii text
+        if not out.isascii():
+            return super().dumps(obj)
+        return out
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+codecs = {'json': JsonCodec}
+if orjson is not None:
+    codecs['orjson'] = OrjsonCodec
+
+codec = OrjsonCodec() if orjson is not None else JsonCodec()
+
+
+def getCodec():
+    return codec
+
+
+def setCodec(value):
+    global codec
+    if isinstance(value, str):
+        if value not in codecs:
+            raise ValueError(f'Unknown JSON codec {value}, available: {", ".join(codecs)}')
+        value = codecs[value]()
+    codec = value
+    return codec
+
+
+class LazyResponse(Mapping):
+    def __init__(self, raw, codec=None):
+        self.raw = raw
+        self.codec = codec or getCodec()
+        self.data = None
+
+    def decoded(self):
+        if self.data is None:
+            self.data = self.codec.loads(self.raw)
+        return self.data
+
+    def peek(self, field):
+        # read a scalar field straight from the raw body; None when absent or not unique
+        pattern = rb'"' + re.escape(field.encode('utf-8')) + rb'"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+)'
+        matches = re.findall(pattern, self.raw)
+        if len(matches) != 1:
+            return None
+        return json.loads(matches[0])
+
+    def __getitem__(self, key):
+        return self.decoded()[key]
+
+    def __iter__(self):
+        return iter(self.decoded())
+
+    def __len__(self):
+        return len(self.decoded())
+
+    def __repr__(self):
+        return repr(self.decoded())
+
+
+def decodeResponse(raw, lazy=False):
+    if lazy:
+        return LazyResponse(raw)
+    return getCodec().loads(raw)
@@ -0,0 +1,99 @@
+import os
+import secrets
+import string
+import threading
+import time
+import weakref
+
+DAY_MILLIS = 86400000
+JAKARTA_OFFSET_MILLIS = 7 * 3600000
+SEQUENCE_LIMIT = 1000
+# pids go up to 4194304 on Linux, so the node needs seven digits
+NODE_DIGITS = 7
+UUID_CHARACTERS = string.ascii_uppercase + string.digits
+# base36 pairs, so a 16 character uuid takes 8 divisions instead of 16
+BASE36_DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+BASE36_PAIRS = [a + b for a in BASE36_DIGITS for b in BASE36_DIGITS]
+NODE_BITS = 22
+SEQUENCE_BITS = 14
+
+generators = weakref.WeakSet()
+
+
+class IdGenerator():
+    # ids are (time in ms, node, sequence): the sequence makes them unique inside one process and the
+    # node, which defaults to the pid, keeps processes apart; pass a distinct node per host when several
+    # hosts share the same credentials
+    def __init__(self, node=None):
+        self.fixedNode = node
+        self.reset()
+        generators.add(self)
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.node = self.fixedNode if self.fixedNode is not None else os.getpid()
+        self.nodeDigits = f'{self.node % 10 ** NODE_DIGITS:0{NODE_DIGITS}d}'
+        self.lastMillis = 0
+        self.sequence = 0
+        self.prefix = (None, '')
+
+    def next(self):
+        now = time.time_ns() // 1000000
+        with self.lock:
+            if now > self.lastMillis:
+                self.lastMillis = now
+                self.sequence = 0
+            elif self.sequence < SEQUENCE_LIMIT - 1:
+                self.sequence += 1
+            else:
+                # the sequence ran out in this millisecond, or the clock stepped back, so borrow the next one
+                self.lastMillis += 1
+                self.sequence = 0
+            return self.lastMillis, self.sequence
+
+    def externalId(self):
+        # 19 digits like the previous format: a leading 1, ms of the Jakarta day, node and sequence
+        millis, sequence = self.next()
+        # the cached prefix is read without the lock; it carries its own ms, so a thread that reads one another
+        # thread has just replaced rebuilds it instead of stamping its id with a different ms
+        prefixMillis, prefix = self.prefix
+        if millis != prefixMillis:
+            prefix = f'1{(millis + JAKARTA_OFFSET_MILLIS) % DAY_MILLIS:08d}{self.nodeDigits}'
+            self.prefix = (millis, prefix)
+        return f'{prefix}{sequence:03d}'
+
+    def uuid(self, length=16):
+        if length != 16:
+            return ''.join(secrets.choice(UUID_CHARACTERS) for _ in range(length))
+        millis, sequence = self.next()
+        value = (((millis << NODE_BITS) | (self.node & ((1 << NODE_BITS) - 1))) << SEQUENCE_BITS) | sequence
+        pairs = []
+        for _ in range(8):
+            value, pair = divmod(value, 1296)
+            pairs.append(BASE36_PAIRS[pair])
+        return ''.join(reversed(pairs))
+
+
+def resetGenerators():
+    for generator in list(generators):
+        generator.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=resetGenerators)
+
+idGenerator = IdGenerator()
+
+
+def getIdGenerator():
+    return idGenerator
+
+
+def setIdGenerator(value):
+    global idGenerator
+    if value is None:
+        value = IdGenerator()
+    elif isinstance(value, int):
+        value = IdGenerator(node=value)
+    idGenerator = value
+    return idGenerator
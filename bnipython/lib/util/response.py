@@ -1,18 +1,69 @@
+from collections.abc import Mapping
+from bnipython.lib.util.codec import LazyResponse
+from bnipython.lib.net.retry import StatusCheckResult
+from bnipython.lib.util.transactionStatus import FAILED, find
+
+
+class ResponseError(ValueError):
+    def __init__(self, message, code=None, response=None):
+        self.code = code
+        self.response = response
+        super().__init__(message)
+
+
+class TransactionFailed(ResponseError):
+    def __init__(self, result):
+        self.result = result
+        super().__init__('\033[91m the status endpoint reports the transaction as failed \033[0m', response=result.response)
+
+
+class TokenRejected(ResponseError):
+    def __init__(self, token, response=None):
+        self.token = token
+        code = find(response, 'responseCode') or find(response, 'error')
+        message = find(response, 'responseMessage') or find(response, 'error_description')
+        super().__init__(f'\033[91m access token was rejected by the gateway, responseCode: {code}, '
+                         f'responseMessage: {message} \033[0m', code, response)
+
+
+
+def statusField(res, path):
+    # lazy responses answer the status check from the raw body and decode the rest on access
+    if isinstance(res, LazyResponse):
+        value = res.peek(path[-1])
+        if value is not None:
+            return value
+    for key in path:
+        if not isinstance(res, Mapping) or key not in res:
+            return None
+        res = res[key]
+    return res
+
+def checkedStatus(result):
+    # a payment whose outcome was recovered from its status endpoint rather than its own response
+    if result.state == FAILED:
+        raise TransactionFailed(result)
+    return result
+
 def responseOGP(params={'res', 'resObj'}):
+    if isinstance(params['res'], StatusCheckResult):
+        return checkedStatus(params['res'])
     try:
-        if (params['res'][params['resObj']]['parameters']['responseCode'] != '0001'):
+        if (statusField(params['res'], [params['resObj'], 'parameters', 'responseCode']) != '0001'):
             code = params['res'][params['resObj']]['parameters']['responseCode']
             responseMessage = params['res'][params['resObj']]['parameters']['responseMessage']
             errorMessage = params['res'][params['resObj']]['parameters']['errorMessage']
-            raise ValueError(f'\033[91m errorMessage: {errorMessage}, responseMessage: {responseMessage}, code: {code} \033[0m')
+            raise ResponseError(f'\033[91m errorMessage: {errorMessage}, responseMessage: {responseMessage}, code: {code} \033[0m', code, params['res'])
         else:
             return params['res']
     except Exception:
         code = params['res']['Response']['parameters']['responseCode']
         message = params['res']['Response']['parameters']['responseMessage']
-        raise ValueError(f'\033[91m {code}:{message} \033[0m')
+        raise ResponseError(f'\033[91m {code}:{message} \033[0m', code, params['res'])
 
 def responseSnapBI(params={'res'}):
+    if isinstance(params['res'], StatusCheckResult):
+        return checkedStatus(params['res'])
     statusCodeSuccess = [
         '2000000',
         '2001100',
@@ -26,67 +77,76 @@ def responseSnapBI(params={'res'}):
         '2003600',
         '2007300'
     ]
-    if not params['res']['responseCode'] in statusCodeSuccess:
-        raise ValueError(
-            f"\033[91m {params['res']['responseCode']} : {params['res']['responseMessage']} \033[0m")
+    if not statusField(params['res'], ['responseCode']) in statusCodeSuccess:
+        raise ResponseError(
+            f"\033[91m {params['res']['responseCode']} : {params['res']['responseMessage']} \033[0m",
+            params['res']['responseCode'], params['res'])
     return params['res']
 
 def responseRDN(params={'res', 'resObj'}):
+    if isinstance(params['res'], StatusCheckResult):
+        return checkedStatus(params['res'])
     try:
         if (params['resObj'] == 'checkSIDResponse'):
             return params['res']   
         elif (params['resObj'] == 'sendDataStaticResponse'):
             return params['res'] 
-        elif (params['res']['response']['responseCode'] != '0001'):
+        elif (statusField(params['res'], ['response', 'responseCode']) != '0001'):
             code = params['res']['response']['responseCode']
             responseMessage = params['res']['response']['responseMessage']
             errorMessage = params['res']['response']['errorMessage']
-            raise ValueError(f'\033[91m errorMessage: {errorMessage}, responseMessage: {responseMessage}, code: {code} \033[0m')
+            raise ResponseError(f'\033[91m errorMessage: {errorMessage}, responseMessage: {responseMessage}, code: {code} \033[0m', code, params['res'])
         else:
             return params['res']
     except Exception as e:
         code = params['res']['Response']['parameters']['responseCode']
         message = params['res']['Response']['parameters']['responseMessage']
-        raise ValueError(f'\033[91m {code}:{message} \033[0m')
+        raise ResponseError(f'\033[91m {code}:{message} \033[0m', code, params['res'])
     
 def responseRDL(params={'res', 'resObj'}):
+    if isinstance(params['res'], StatusCheckResult):
+        return checkedStatus(params['res'])
     try:
         if (params['resObj'] == 'checkSIDResponse'):
             return params['res']    
         elif (params['resObj'] == 'sendDataStaticResponse'):
             return params['res'] 
-        elif (params['res']['response']['responseCode'] != '0001'):
+        elif (statusField(params['res'], ['response', 'responseCode']) != '0001'):
             code = params['res']['response']['responseCode']
             responseMessage = params['res']['response']['responseMessage']
             errorMessage = params['res']['response']['errorMessage']
-            raise ValueError(f'\033[91m errorMessage: {errorMessage}, responseMessage: {responseMessage}, code: {code} \033[0m')
+            raise ResponseError(f'\033[91m errorMessage: {errorMessage}, responseMessage: {responseMessage}, code: {code} \033[0m', code, params['res'])
         else:
             return params['res']
     except Exception as e:
         code = params['res']['Response']['parameters']['responseCode']
         message = params['res']['Response']['parameters']['responseMessage']
-        raise ValueError(f'\033[91m {code}:{message} \033[0m')
+        raise ResponseError(f'\033[91m {code}:{message} \033[0m', code, params['res'])
 
 def responseRDF(params={'res'}):
+    if isinstance(params['res'], StatusCheckResult):
+        return checkedStatus(params['res'])
     try:
-        if (params['res']['response']['responseCode'] != '0001'):
+        if (statusField(params['res'], ['response', 'responseCode']) != '0001'):
             code = params['res']['response']['responseCode']
             responseMessage = params['res']['response']['responseMessage']
             errorMessage = params['res']['response']['errorMessage']
-            raise ValueError(f'\033[91m errorMessage: {errorMessage}, responseMessage: {responseMessage}, code: {code} \033[0m')
+            raise ResponseError(f'\033[91m errorMessage: {errorMessage}, responseMessage: {responseMessage}, code: {code} \033[0m', code, params['res'])
         else:
             return params['res']
     except Exception as e:
         code = params['res']['Response']['parameters']['responseCode']
         message = params['res']['Response']['parameters']['responseMessage']
-        raise ValueError(f'\033[91m {code}:{message} \033[0m')
+        raise ResponseError(f'\033[91m {code}:{message} \033[0m', code, params['res'])
     
 def responseBNIMove(params={'res'}):
-    status_code = params['res'].get('statusCode')
+    if isinstance(params['res'], StatusCheckResult):
+        return checkedStatus(params['res'])
+    status_code = statusField(params['res'], ['statusCode'])
     if status_code is None:
-        raise ValueError("Missing status code in response")
+        raise ResponseError("Missing status code in response")
     if status_code != 0:
         status_message = params['res'].get('statusDescription', 'Unknown Error')
         error_message = f"Error: {status_code} - {status_message}"
-        raise ValueError(error_message)
+        raise ResponseError(error_message, status_code, params['res'])
     return params['res']
\ No newline at end of file
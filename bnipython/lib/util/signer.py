@@ -0,0 +1,54 @@
+import base64
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta, timezone
+from bnipython.lib.util.utils import generateClientId
+
+# Asia/Jakarta has kept +07:00 without DST since 1964, and the formats below hard-code that offset
+JAKARTA = timezone(timedelta(hours=7), 'WIB')
+
+
+def urlsafe(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+class Signer():
+    # everything that only depends on the client config is computed here once; the HMAC objects
+    # already hold the keyed state, so each signature copies them instead of re-keying
+    def __init__(self, config):
+        self.apiSecret = str(config.get('apiSecret', '')).encode('utf-8')
+        self.clientId = generateClientId(config.get('appName', ''))
+        self.timezone = JAKARTA
+        self.jwtHeader = urlsafe(b'{"alg":"HS256","typ":"JWT"}') + b'.'
+        self.jwtMac = hmac.new(self.apiSecret, self.jwtHeader, hashlib.sha256)
+        self.snapMac = hmac.new(self.apiSecret, digestmod=hashlib.sha512)
+        self.second = (None, '')
+
+    def jwt(self, bodyBytes):
+        signed = self.jwtHeader + urlsafe(bodyBytes)
+        mac = self.jwtMac.copy()
+        mac.update(signed[len(self.jwtHeader):])
+        return (signed + b'.' + urlsafe(mac.digest())).decode()
+
+    def snapSignature(self, method, url, accessToken, bodyBytes, timeStamp):
+        bodyHash = hashlib.sha256(bodyBytes).hexdigest()
+        mac = self.snapMac.copy()
+        mac.update(f'{method}:{url}:{accessToken}:{bodyHash}:{timeStamp}'.encode('utf-8'))
+        return base64.b64encode(mac.digest()).decode()
+
+    def secondPrefix(self, seconds):
+        # strftime runs once per second; the cache holds the second next to its text, so a thread racing a
+        # refresh either sees the old pair or the new one and never formats one second with another's text
+        second, prefix = self.second
+        if second != seconds:
+            prefix = datetime.fromtimestamp(seconds, self.timezone).strftime('%Y-%m-%dT%H:%M:%S')
+            self.second = (seconds, prefix)
+        return prefix
+
+    def timestamp(self):
+        return f'{self.secondPrefix(int(time.time()))}+07:00'
+
+    def timestampBNIMove(self):
+        millis = time.time_ns() // 1000000
+        return f'{self.secondPrefix(millis // 1000)}.{millis % 1000:03d}+07:00'
@@ -0,0 +1,53 @@
+import base64
+import os
+import threading
+from OpenSSL import crypto
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+
+def loadPrivateKey(key, password=None):
+    if isinstance(key, SigningKey):
+        return key.key
+    if isinstance(key, crypto.PKey):
+        return key.to_cryptography_key()
+    if isinstance(key, rsa.RSAPrivateKey):
+        return key
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    if isinstance(key, str) and '-----BEGIN' in key:
+        key = key.encode('utf-8')
+    elif isinstance(key, (str, os.PathLike)):
+        with open(key, 'rb') as keyFile:
+            key = keyFile.read()
+    if not isinstance(key, (bytes, bytearray)):
+        raise ValueError('privateKey must be a path, PEM/DER bytes or a loaded RSA private key')
+    if bytes(key).lstrip().startswith(b'-----BEGIN'):
+        return serialization.load_pem_private_key(bytes(key), password=password)
+    return serialization.load_der_private_key(bytes(key), password=password)
+
+
+class SigningKey():
+    def __init__(self, key, password=None):
+        self.key = loadPrivateKey(key, password)
+
+    def sign(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        signature = self.key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+        return base64.b64encode(signature).decode()
+
+
+signingKeys = {}
+signingKeysLock = threading.Lock()
+
+
+def getSigningKey(privateKeyPath):
+    signingKey = signingKeys.get(privateKeyPath)
+    if signingKey is None:
+        with signingKeysLock:
+            signingKey = signingKeys.get(privateKeyPath)
+            if signingKey is None:
+                signingKey = SigningKey(privateKeyPath)
+                signingKeys[privateKeyPath] = signingKey
+    return signingKey
@@ -0,0 +1,23 @@
+import os
+import sqlite3
+import threading
+
+
+class SqliteConnections():
+    # one connection per thread, opened again in a forked child: sqlite connections cannot be shared between
+    # threads or carried across a fork
+    def __init__(self, path, pragmas=()):
+        self.path = path
+        self.pragmas = pragmas
+        self.local = threading.local()
+
+    def get(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            for pragma in self.pragmas:
+                conn.execute(f'PRAGMA {pragma}')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
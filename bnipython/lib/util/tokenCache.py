@@ -0,0 +1,129 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+caches = weakref.WeakSet()
+
+
+class TokenCache():
+    def __init__(self, refreshMargin=60, defaultExpiresIn=3600, backgroundRefresh=True):
+        self.refreshMargin = refreshMargin
+        self.defaultExpiresIn = defaultExpiresIn
+        self.backgroundRefresh = backgroundRefresh
+        self.entries = {}
+        self.reset()
+        caches.add(self)
+
+    def reset(self):
+        # a forked child inherits the locks held by the parent's threads, such as a background refresh,
+        # but not the threads that would release them, nor the parent's event loops
+        self.locks = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+    def store(self, key, token, expiresIn=None):
+        try:
+            expiresIn = float(expiresIn)
+        except (TypeError, ValueError):
+            expiresIn = self.defaultExpiresIn
+        now = time.monotonic()
+        # refresh ahead of expiry, but never spend more than half the lifetime on the margin
+        refreshAt = now + expiresIn - min(self.refreshMargin, expiresIn / 2)
+        self.entries[key] = (token, now + expiresIn, refreshAt)
+        return token
+
+    def peek(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and time.monotonic() < entry[2]:
+            return entry[0]
+        return None
+
+    def peekUsable(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and time.monotonic() < entry[1]:
+            return entry[0]
+        return None
+
+    def invalidate(self, key, token=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (token is None or entry[0] == token):
+                del self.entries[key]
+
+    def keyLock(self, key):
+        with self.lock:
+            if key not in self.locks:
+                self.locks[key] = threading.Lock()
+            return self.locks[key]
+
+    def get(self, key, fetch):
+        token = self.peek(key)
+        if token is not None:
+            return token
+        if self.backgroundRefresh:
+            # inside the refresh margin: keep serving the current token while one thread renews it
+            token = self.peekUsable(key)
+            if token is not None:
+                self.refreshInBackground(key, fetch)
+                return token
+        with self.keyLock(key):
+            token = self.peek(key)
+            if token is not None:
+                return token
+            token, expiresIn = fetch()
+            return self.store(key, token, expiresIn)
+
+    def refreshInBackground(self, key, fetch):
+        lock = self.keyLock(key)
+        if not lock.acquire(blocking=False):
+            return
+
+        def refresh():
+            try:
+                if self.peek(key) is None:
+                    token, expiresIn = fetch()
+                    self.store(key, token, expiresIn)
+            except Exception:
+                # a failed early refresh is retried in the foreground once the token expires
+                pass
+            finally:
+                lock.release()
+        threading.Thread(target=refresh, daemon=True).start()
+
+    async def getAsync(self, key, fetch):
+        token = self.peek(key)
+        if token is not None:
+            return token
+        loop = asyncio.get_running_loop()
+        task = self.inflight.get((loop, key))
+        if task is None:
+            task = loop.create_task(self.fetchAsync(loop, key, fetch))
+            # mark the error as retrieved when nobody awaits a background refresh
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.inflight[(loop, key)] = task
+        if self.backgroundRefresh:
+            token = self.peekUsable(key)
+            if token is not None:
+                return token
+        # shield so a cancelled caller does not abort the refresh other callers are waiting on
+        return await asyncio.shield(task)
+
+    async def fetchAsync(self, loop, key, fetch):
+        try:
+            token, expiresIn = await fetch()
+            return self.store(key, token, expiresIn)
+        finally:
+            self.inflight.pop((loop, key), None)
+
+
+def resetCaches():
+    for cache in list(caches):
+        cache.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=resetCaches)
+
+tokenCache = TokenCache()
@@ -0,0 +1,77 @@
+from collections.abc import Mapping
+
+SUCCESS = 'success'
+FAILED = 'failed'
+PENDING = 'pending'
+NOT_FOUND = 'notFound'
+
+# SNAP latestTransactionStatus, per the SNAP BI transaction status inquiry specification
+snapStates = {
+    '00': SUCCESS,
+    '01': PENDING,
+    '02': PENDING,
+    '03': PENDING,
+    '04': FAILED,
+    '05': FAILED,
+    '06': FAILED,
+    '07': NOT_FOUND
+}
+
+# the H2H and RDN/RDL/RDF status endpoints echo the original transaction in previousResponse
+h2hStates = {
+    'Y': SUCCESS,
+    'S': SUCCESS,
+    'SUCCESS': SUCCESS,
+    'N': FAILED,
+    'F': FAILED,
+    'R': FAILED,
+    'FAILED': FAILED,
+    'REJECTED': FAILED,
+    'P': PENDING,
+    'PENDING': PENDING,
+    'PROCESS': PENDING,
+    'PROCESSING': PENDING,
+    'IN PROGRESS': PENDING,
+    'ON PROCESS': PENDING
+}
+
+# response codes the status endpoints use for "no such transaction"; only these make a payment safe to
+# send again. The H2H and RDN/RDL/RDF codes are not published, so those products never resend until
+# their code is added here
+notFoundCodes = {
+    'SnapBI': {'4043601'},
+    'OneGatePayment': set(),
+    'RDN': set(),
+    'RDL': set(),
+    'RDF': set()
+}
+
+
+def find(res, name):
+    if not isinstance(res, Mapping):
+        return None
+    if name in res:
+        return res[name]
+    for value in res.values():
+        found = find(value, name)
+        if found is not None:
+            return found
+    return None
+
+
+def transactionState(product, res):
+    # SUCCESS, FAILED, PENDING or NOT_FOUND, or None when the response does not say
+    if product == 'SnapBI':
+        return snapStates.get(str(find(res, 'latestTransactionStatus')))
+    previous = find(res, 'previousResponse')
+    status = find(previous, 'transactionStatus')
+    if status is not None:
+        return h2hStates.get(str(status).strip().upper())
+    code = find(previous, 'previousResponseCode')
+    if code is not None:
+        return SUCCESS if code == '0001' else FAILED
+    return None
+
+
+def isNotFound(product, error):
+    return getattr(error, 'code', None) in notFoundCodes.get(product, ())
@@ -1,21 +1,38 @@
 import base64
 import hmac
 import hashlib
-import json
 import pytz
-import random
-import math
-import string
-from OpenSSL import crypto
 from datetime import datetime
+from bnipython.lib.util.signingKey import getSigningKey
+from bnipython.lib.util.codec import getCodec
+from bnipython.lib.util.idGenerator import getIdGenerator
+
+jakarta = pytz.timezone('Asia/Jakarta')
+
+
+def encodeBody(body):
+    return getCodec().dumps(body)
+
+
+def extendBody(bodyBytes, fields):
+    # append top-level fields to an already encoded JSON object without re-encoding it
+    extra = encodeBody(fields)
+    if bodyBytes == b'{}':
+        return extra
+    if extra == b'{}':
+        return bodyBytes
+    return bodyBytes[:-1] + b',' + extra[1:]
+
 
 def generateSignature(params):
     # generate JWT header
     header = escape(base64.b64encode(
         '{"alg":"HS256","typ":"JWT"}'.encode('utf-8')).decode())
     # generate JWT payload
-    payload = escape(base64.b64encode(json.dumps(
-        params['body'], separators=(',', ':')).encode('utf-8')).decode())
+    bodyBytes = params.get('bodyBytes')
+    if bodyBytes is None:
+        bodyBytes = encodeBody(params['body'])
+    payload = escape(base64.b64encode(bodyBytes).decode())
     encript = header+'.'+payload
     # generate JWT signature
     jwtSignature = escape(base64.b64encode(hmac.new(str(params['apiSecret']).encode('utf-8'),
@@ -32,31 +49,26 @@ def escape(string):
     return string.replace('+', '-').replace('/', '_').replace('=', '')
 
 def getTimestamp():
-    return datetime.now(pytz.timezone('Asia/Jakarta')).strftime('%Y-%m-%dT%H:%M:%S+07:00')
+    return datetime.now(jakarta).strftime('%Y-%m-%dT%H:%M:%S+07:00')
 
 def getTimestampBNIMove():
-    return datetime.now(pytz.timezone('Asia/Jakarta')).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + '+07:00'
+    return datetime.now(jakarta).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + '+07:00'
 
 def generateTokenSignature(params={'privateKeyPath', 'clientId', 'timeStamp'}):
-    privateKeyPath = params['privateKeyPath']
-    rsaPrivate = privateKeyPath.replace('./', '')
-    keyFile = open(f'{rsaPrivate}', 'rb')
-    key = keyFile.read()
-    keyFile.close()
-
-    pkey = crypto.load_privatekey(crypto.FILETYPE_PEM, key)
+    signingKey = params.get('signingKey')
+    if signingKey is None:
+        signingKey = getSigningKey(params['privateKeyPath'])
     clienId = params['clientId']
     times = params['timeStamp']
     data = f"{clienId}|{times}"
-
-    dataBytes = bytes(data, encoding='utf-8')
-    signature = base64.b64encode(crypto.sign(pkey, dataBytes, "sha256"))
-    return signature.decode()
+    return signingKey.sign(data)
 
 
 def generateSignatureServiceSnapBI(params={'body', 'method', 'url', 'accessToken', 'timeStamp', 'apiSecret'}):
-    minify = json.dumps(params['body'], separators=(',', ':'))
-    shaHex = hashlib.sha256(minify.encode('utf-8')).hexdigest()
+    bodyBytes = params.get('bodyBytes')
+    if bodyBytes is None:
+        bodyBytes = encodeBody(params['body'])
+    shaHex = hashlib.sha256(bodyBytes).hexdigest()
     lower = shaHex.lower()
 
     stringToSign = f"{params['method']}:{params['url']}:{params['accessToken']}:{lower}:{params['timeStamp']}"
@@ -67,11 +79,7 @@ def generateSignatureServiceSnapBI(params={'body', 'method', 'url', 'accessToken
     return data.decode()
 
 def randomNumber():
-    randomNumber = random.randint(100000000, 999999999)
-    unixTimeStamp = math.floor(datetime.timestamp((datetime.now())))
-    return f'{randomNumber}{unixTimeStamp}'
+    return getIdGenerator().externalId()
 
 def generateUUID(length=16):
-    characters = string.ascii_uppercase + string.digits
-    uuid = ''.join(random.choice(characters) for _ in range(length))
-    return uuid
+    return getIdGenerator().uuid(length)
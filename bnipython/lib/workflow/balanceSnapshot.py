@@ -0,0 +1,179 @@
+import asyncio
+import csv
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from bnipython.lib.net.rateLimiter import TokenBucket
+from bnipython.lib.util.idGenerator import getIdGenerator
+
+
+class BalanceColumns():
+    fields = ('account', 'balance', 'currency', 'timestamp', 'error')
+
+    def __init__(self):
+        self.account = []
+        self.balance = []
+        self.currency = []
+        self.timestamp = []
+        self.error = []
+
+    def append(self, account, balance, currency, timestamp, error):
+        self.account.append(account)
+        self.balance.append(balance)
+        self.currency.append(currency)
+        self.timestamp.append(timestamp)
+        self.error.append(error)
+
+    def rows(self):
+        return zip(self.account, self.balance, self.currency, self.timestamp, self.error)
+
+    def columns(self):
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __len__(self):
+        return len(self.account)
+
+
+def rdBalance(res):
+    # {"response": {"responseCode": "0001", "responseTimestamp": ..., "accountCurrency": "IDR", "accountBalance": ...}}
+    body = res['response']
+    return body['accountBalance'], body['accountCurrency'], body.get('responseTimestamp')
+
+
+def snapBalance(res):
+    # {"responseCode": "2001100", "accountInfos": [{"availableBalance": {"value": "...", "currency": "IDR"}, ...}]}
+    # the response carries no timestamp of its own
+    available = res['accountInfos'][0]['availableBalance']
+    return available['value'], available['currency'], None
+
+
+class BalanceSnapshot():
+    products = ('rdn', 'rdl', 'rdf', 'snap')
+
+    def __init__(self, client, options={'product', 'companyId', 'parentCompanyId', 'concurrency', 'rate', 'chunkSize'}):
+        self.client = client
+        self.product = options.get('product', 'rdn')
+        if self.product not in self.products:
+            raise ValueError(f'Unknown product {self.product}, available: {", ".join(self.products)}')
+        self.companyId = options.get('companyId')
+        self.parentCompanyId = options.get('parentCompanyId', '')
+        self.concurrency = options.get('concurrency', 16)
+        self.chunkSize = options.get('chunkSize', 1000)
+        rate = options.get('rate')
+        self.bucket = TokenBucket('balanceSnapshot', rate, options.get('burst')) if rate else None
+
+    def account(self, item):
+        return item['accountNumber'] if isinstance(item, Mapping) else item
+
+    def call(self, item):
+        api = self.client.product(self.product)
+        if self.product == 'snap':
+            return api.balanceInquiry({'partnerReferenceNo': getIdGenerator().externalId(), 'accountNo': self.account(item)})
+        params = {'companyId': self.companyId, 'parentCompanyId': self.parentCompanyId, 'accountNumber': self.account(item)}
+        if isinstance(item, Mapping):
+            params.update(item)
+        return api.inquiryAccountBalance(params)
+
+    def row(self, item, res, error):
+        if error is not None:
+            return self.account(item), None, None, self.client.signer.timestamp(), str(error)
+        balance, currency, timestamp = snapBalance(res) if self.product == 'snap' else rdBalance(res)
+        return self.account(item), balance, currency, timestamp or self.client.signer.timestamp(), None
+
+    def query(self, item):
+        try:
+            return self.row(item, self.call(item), None)
+        except Exception as e:
+            return self.row(item, None, e)
+
+    def pace(self):
+        return self.bucket.reserve() if self.bucket is not None else 0.0
+
+    def run(self, accounts):
+        # yields BalanceColumns of about chunkSize rows in completion order; only the current chunk and the
+        # queries in flight are held, however long the account stream is
+        chunk = BalanceColumns()
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='bnipython-balance') as pool:
+            pending = set()
+            for item in accounts:
+                delay = self.pace()
+                if delay > 0:
+                    time.sleep(delay)
+                pending.add(pool.submit(self.query, item))
+                if len(pending) < self.concurrency:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk.append(*future.result())
+                if len(chunk) >= self.chunkSize:
+                    yield chunk
+                    chunk = BalanceColumns()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk.append(*future.result())
+                if len(chunk) >= self.chunkSize:
+                    yield chunk
+                    chunk = BalanceColumns()
+        if len(chunk):
+            yield chunk
+
+    def write(self, accounts, path):
+        total = errors = 0
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            writer = csv.writer(output)
+            writer.writerow(BalanceColumns.fields)
+            for chunk in self.run(accounts):
+                writer.writerows(chunk.rows())
+                total += len(chunk)
+                errors += sum(1 for error in chunk.error if error is not None)
+        return {'accounts': total, 'errors': errors}
+
+
+class AsyncBalanceSnapshot(BalanceSnapshot):
+    async def query(self, item):
+        try:
+            return self.row(item, await self.call(item), None)
+        except Exception as e:
+            return self.row(item, None, e)
+
+    async def run(self, accounts):
+        chunk = BalanceColumns()
+        pending = set()
+        try:
+            for item in accounts:
+                delay = self.pace()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                pending.add(asyncio.ensure_future(self.query(item)))
+                if len(pending) < self.concurrency:
+                    continue
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    chunk.append(*task.result())
+                if len(chunk) >= self.chunkSize:
+                    yield chunk
+                    chunk = BalanceColumns()
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    chunk.append(*task.result())
+                if len(chunk) >= self.chunkSize:
+                    yield chunk
+                    chunk = BalanceColumns()
+        finally:
+            for task in pending:
+                task.cancel()
+        if len(chunk):
+            yield chunk
+
+    async def write(self, accounts, path):
+        total = errors = 0
+        with open(path, 'w', newline='', encoding='utf-8') as output:
+            writer = csv.writer(output)
+            writer.writerow(BalanceColumns.fields)
+            async for chunk in self.run(accounts):
+                writer.writerows(chunk.rows())
+                total += len(chunk)
+                errors += sum(1 for error in chunk.error if error is not None)
+        return {'accounts': total, 'errors': errors}
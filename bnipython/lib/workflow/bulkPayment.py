@@ -0,0 +1,200 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from bnipython.lib.net.circuitBreaker import CircuitOpenError
+from bnipython.lib.net.deadline import DeadlineExceeded
+from bnipython.lib.net.httpClient import classifyError
+from bnipython.lib.net.rateLimiter import RateLimitExceeded
+from bnipython.lib.net.retry import NOT_SENT as ATTEMPT_NOT_SENT, StatusCheckResult
+from bnipython.lib.util.response import ResponseError
+from bnipython.lib.util.transactionStatus import SUCCESS, FAILED as TRANSACTION_FAILED, transactionState, isNotFound
+from bnipython.lib.workflow.source import readRows
+from bnipython.lib.workflow.checkpoint import Checkpoint, JsonLinesWriter
+
+STARTED = 'started'
+DONE = 'done'
+FAILED = 'failed'
+UNKNOWN = 'unknown'
+NOT_SENT = 'notSent'
+SKIPPED = 'skipped'
+
+paymentFields = ('customerReferenceNumber', 'paymentMethod', 'debitAccountNo', 'creditAccountNo', 'valueDate',
+                 'valueCurrency', 'valueAmount', 'remark', 'beneficiaryEmailAddress', 'beneficiaryName',
+                 'beneficiaryAddress1', 'beneficiaryAddress2', 'destinationBankCode', 'chargingModelId')
+
+
+class BulkPayment():
+    syncOnWrite = True
+
+    def __init__(self, client, options={'concurrency', 'checkpoint', 'output', 'durable', 'retryFailed', 'onResult'}):
+        self.client = client
+        self.concurrency = options.get('concurrency', 8)
+        self.checkpointPath = options.get('checkpoint')
+        self.outputPath = options.get('output')
+        self.durable = options.get('durable', True)
+        self.retryFailed = options.get('retryFailed', False)
+        self.onResult = options.get('onResult')
+        self.checkpoint = None
+        self.output = None
+        self.summary = None
+
+    def open(self):
+        self.checkpoint = Checkpoint(self.checkpointPath, self.durable and self.syncOnWrite)
+        self.output = JsonLinesWriter(self.outputPath)
+        self.summary = {DONE: 0, FAILED: 0, UNKNOWN: 0, NOT_SENT: 0, SKIPPED: 0}
+        self.seen = set()
+
+    def close(self):
+        self.checkpoint.close()
+        self.output.close()
+        self.seen = None
+
+    def plan(self, row):
+        # None skips the row, False submits it, True checks its status first because an earlier run
+        # may have sent it without learning the outcome
+        reference = row.get('customerReferenceNumber')
+        if not reference:
+            self.record(reference, FAILED, error='customerReferenceNumber is missing')
+            return None
+        if reference in self.seen:
+            self.record(reference, SKIPPED, error='duplicate customerReferenceNumber')
+            return None
+        self.seen.add(reference)
+        state = self.checkpoint.state(reference)
+        if state == DONE or (state == FAILED and not self.retryFailed):
+            self.summary[SKIPPED] += 1
+            return None
+        if state in (STARTED, UNKNOWN):
+            return True
+        # checked before the row is marked as started, so a row that cannot be sent is never in doubt
+        missing = [name for name in paymentFields if name not in row]
+        if missing:
+            self.record(reference, FAILED, error=f'missing {", ".join(missing)}')
+            return None
+        self.checkpoint.mark(reference, STARTED)
+        return False
+
+    def outcome(self, error):
+        # these fail before the payment leaves the client, so the next run sends it again as it is
+        if isinstance(error, (CircuitOpenError, RateLimitExceeded, DeadlineExceeded)) \
+                or classifyError(error) == ATTEMPT_NOT_SENT:
+            return NOT_SENT
+        if isinstance(error, ResponseError):
+            return FAILED
+        # anything else, such as a response that cannot be parsed, may follow a processed payment
+        return UNKNOWN
+
+    def settled(self, res):
+        # a status response only settles the row when it reports the payment itself as succeeded or failed
+        state = res.state if isinstance(res, StatusCheckResult) else transactionState('OneGatePayment', res)
+        if state == SUCCESS:
+            return DONE
+        return FAILED if state == TRANSACTION_FAILED else UNKNOWN
+
+    def paid(self, res):
+        return (self.settled(res) if isinstance(res, StatusCheckResult) else DONE), res, None
+
+    def process(self, row, recovering):
+        try:
+            if recovering:
+                try:
+                    status = self.client.ogp.getPaymentStatus({'customerReferenceNumber': row['customerReferenceNumber']})
+                except Exception as e:
+                    # only a bank that explicitly has no record of the payment makes it safe to send again;
+                    # a lookup that never got an answer says nothing about the payment
+                    if not isNotFound('OneGatePayment', e):
+                        return UNKNOWN, None, e
+                else:
+                    return self.settled(status), status, None
+            return self.paid(self.client.ogp.doPayment(row))
+        except Exception as e:
+            return self.outcome(e), None, e
+
+    def record(self, reference, state, response=None, error=None):
+        if state != SKIPPED and reference:
+            self.checkpoint.mark(reference, state)
+        result = {'customerReferenceNumber': reference, 'state': state}
+        if response is not None:
+            result['response'] = response
+        if error is not None:
+            result['error'] = str(error)
+        self.output.write(result)
+        self.summary[state] += 1
+        if self.onResult is not None:
+            self.onResult(result)
+
+    def collect(self, pending, returnWhen):
+        done, _ = wait(pending, return_when=returnWhen)
+        for future in done:
+            reference = pending.pop(future)
+            self.record(reference, *future.result())
+
+    def run(self, source):
+        self.open()
+        try:
+            with ThreadPoolExecutor(self.concurrency, thread_name_prefix='bnipython-bulk') as pool:
+                pending = {}
+                for row in readRows(source):
+                    recovering = self.plan(row)
+                    if recovering is None:
+                        continue
+                    pending[pool.submit(self.process, row, recovering)] = row['customerReferenceNumber']
+                    if len(pending) >= self.concurrency:
+                        self.collect(pending, FIRST_COMPLETED)
+                if pending:
+                    self.collect(pending, ALL_COMPLETED)
+            return self.summary
+        finally:
+            self.close()
+
+
+class AsyncBulkPayment(BulkPayment):
+    # fsync blocks, so the journal is synced from the default executor rather than on every write
+    syncOnWrite = False
+
+    async def sync(self):
+        if self.durable:
+            await asyncio.get_running_loop().run_in_executor(None, self.checkpoint.sync)
+
+    async def process(self, row, recovering):
+        # the row's started mark has to be on disk before its payment is sent
+        await self.sync()
+        try:
+            if recovering:
+                try:
+                    status = await self.client.ogp.getPaymentStatus(
+                        {'customerReferenceNumber': row['customerReferenceNumber']})
+                except Exception as e:
+                    if not isNotFound('OneGatePayment', e):
+                        return UNKNOWN, None, e
+                else:
+                    return self.settled(status), status, None
+            return self.paid(await self.client.ogp.doPayment(row))
+        except Exception as e:
+            return self.outcome(e), None, e
+
+    async def collect(self, pending, returnWhen):
+        done, _ = await asyncio.wait(pending, return_when=returnWhen)
+        for task in done:
+            reference = pending.pop(task)
+            self.record(reference, *task.result())
+        await self.sync()
+
+    async def run(self, source):
+        self.open()
+        pending = {}
+        try:
+            for row in readRows(source):
+                recovering = self.plan(row)
+                if recovering is None:
+                    continue
+                pending[asyncio.ensure_future(self.process(row, recovering))] = row['customerReferenceNumber']
+                if len(pending) >= self.concurrency:
+                    await self.collect(pending, asyncio.FIRST_COMPLETED)
+            if pending:
+                await self.collect(pending, asyncio.ALL_COMPLETED)
+            await self.sync()
+            return self.summary
+        finally:
+            for task in pending:
+                task.cancel()
+            self.close()
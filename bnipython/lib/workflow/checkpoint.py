@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+from collections.abc import Mapping
+
+
+def plain(value):
+    # lazy responses and status check results are read-only Mappings that json cannot encode, and they
+    # may sit anywhere inside a record
+    if isinstance(value, Mapping):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+class JsonLinesWriter():
+    def __init__(self, path, durable=False):
+        self.path = path
+        self.durable = durable
+        self.lock = threading.Lock()
+        self.file = None
+        if path is not None:
+            partial = self.endsMidLine(path)
+            self.file = open(path, 'a', encoding='utf-8')
+            if partial:
+                # start on a fresh line when the previous run died halfway through one
+                self.file.write('\n')
+
+    def endsMidLine(self, path):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return False
+        with open(path, 'rb') as existing:
+            existing.seek(-1, os.SEEK_END)
+            return existing.read(1) != b'\n'
+
+    def write(self, record):
+        if self.file is None:
+            return
+        line = json.dumps(plain(record), separators=(',', ':'), default=str) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            if self.durable:
+                os.fsync(self.file.fileno())
+
+    def sync(self):
+        with self.lock:
+            if self.file is not None:
+                os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Checkpoint(JsonLinesWriter):
+    # an append-only journal of {key, state}; the last state written for a key wins when it is loaded back
+    def __init__(self, path, durable=True):
+        self.states = self.load(path)
+        super().__init__(path, durable)
+
+    def load(self, path):
+        states = {}
+        if path is None or not os.path.exists(path):
+            return states
+        with open(path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # the last line of a run that crashed mid-write
+                    continue
+                states[entry['key']] = entry['state']
+        return states
+
+    def state(self, key):
+        return self.states.get(key)
+
+    def mark(self, key, state):
+        self.states[key] = state
+        self.write({'key': key, 'state': state})
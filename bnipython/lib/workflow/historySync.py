@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import Counter
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from bnipython.lib.util.sqliteConnections import SqliteConnections
+from bnipython.lib.workflow.checkpoint import plain
+
+timeFields = ('transactionDateTime', 'transactionDate', 'txnDate', 'postingDate', 'valueDate', 'date')
+idFields = ('transactionId', 'transactionReference', 'referenceNumber', 'referenceNo', 'journalNumber', 'journalNo',
+            'txnId', 'refNo')
+timeFormats = (
+    ('%Y-%m-%dT%H:%M:%S', 19), ('%Y-%m-%d %H:%M:%S', 19), ('%d/%m/%Y %H:%M:%S', 19), ('%d-%m-%Y %H:%M:%S', 19),
+    ('%Y-%m-%d', 10), ('%d/%m/%Y', 10), ('%d-%m-%Y', 10), ('%Y%m%d', 8)
+)
+
+
+def parseTime(value):
+    if not isinstance(value, str):
+        return None
+    for timeFormat, length in timeFormats:
+        try:
+            return datetime.strptime(value[:length], timeFormat)
+        except ValueError:
+            continue
+    return None
+
+
+def entryTime(entry):
+    for name in timeFields:
+        if name in entry:
+            parsed = parseTime(entry[name])
+            if parsed is not None:
+                return parsed.strftime('%Y-%m-%dT%H:%M:%S')
+    return None
+
+
+def digest(value):
+    return hashlib.sha256(value.encode('utf-8')).digest()[:16]
+
+
+def entryKey(entry):
+    # the gateway's own reference when the entry carries one, its whole content otherwise
+    for name in idFields:
+        if entry.get(name) not in (None, ''):
+            return digest(f'{name}:{entry[name]}')
+    return digest(json.dumps(plain(entry), sort_keys=True, separators=(',', ':'), default=str))
+
+
+def occurrenceKey(key, occurrence):
+    # identical statement lines, such as two equal transfers on one day, are separate entries
+    return key if occurrence == 1 else digest(f'{key.hex()}#{occurrence}')
+
+
+def historyEntries(res):
+    # the first list of objects in the response, wherever the product puts it
+    if isinstance(res, Mapping):
+        for value in res.values():
+            found = historyEntries(value)
+            if found is not None:
+                return found
+    elif isinstance(res, list) and res and all(isinstance(item, Mapping) for item in res):
+        return res
+    return None
+
+
+class HistoryStore():
+    def __init__(self, path):
+        self.path = path
+        self.connections = SqliteConnections(path)
+        self.setup()
+
+    def connection(self):
+        return self.connections.get()
+
+    def setup(self):
+        conn = self.connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS cursors '
+                     '(account TEXT PRIMARY KEY, lastKey BLOB, lastTime TEXT, syncedAt REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS seen '
+                     '(account TEXT, key BLOB, time TEXT, PRIMARY KEY (account, key)) WITHOUT ROWID')
+
+    def cursor(self, account):
+        row = self.connection().execute(
+            'SELECT lastKey, lastTime, syncedAt FROM cursors WHERE account = ?', (account,)).fetchone()
+        if row is None:
+            return None
+        return {'lastKey': row[0], 'lastTime': row[1], 'syncedAt': row[2]}
+
+    def keys(self, account, since):
+        if since is None:
+            rows = self.connection().execute('SELECT key FROM seen WHERE account = ?', (account,))
+        else:
+            rows = self.connection().execute(
+                'SELECT key FROM seen WHERE account = ? AND (time IS NULL OR time >= ?)', (account, since))
+        return {row[0] for row in rows}
+
+    def commit(self, account, added, lastKey, lastTime, pruneBefore):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT OR IGNORE INTO seen (account, key, time) VALUES (?, ?, ?)',
+                             [(account, key, when) for key, when in added])
+            conn.execute('INSERT OR REPLACE INTO cursors (account, lastKey, lastTime, syncedAt) VALUES (?, ?, ?, ?)',
+                         (account, lastKey, lastTime, time.time()))
+            if pruneBefore is not None:
+                # entries this old are skipped by time alone, so their keys no longer need to be kept
+                conn.execute('DELETE FROM seen WHERE account = ? AND time < ?', (account, pruneBefore))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def reset(self, account):
+        conn = self.connection()
+        conn.execute('DELETE FROM cursors WHERE account = ?', (account,))
+        conn.execute('DELETE FROM seen WHERE account = ?', (account,))
+
+
+class HistorySync():
+    products = ('rdn', 'rdl', 'rdf')
+
+    def __init__(self, client, options={'product', 'companyId', 'parentCompanyId', 'path', 'overlap', 'entries', 'entryKey', 'entryTime'}):
+        self.client = client
+        self.product = options.get('product', 'rdn')
+        if self.product not in self.products:
+            raise ValueError(f'Unknown product {self.product}, available: {", ".join(self.products)}')
+        self.companyId = options.get('companyId')
+        self.parentCompanyId = options.get('parentCompanyId', '')
+        self.store = HistoryStore(options.get('path', 'bnipython-history.sqlite'))
+        # statements often carry only a date, so entries near the cursor are checked by key rather than time
+        self.overlap = timedelta(seconds=options.get('overlap', 86400))
+        self.entries = options.get('entries', historyEntries)
+        self.entryKey = options.get('entryKey', entryKey)
+        self.entryTime = options.get('entryTime', entryTime)
+
+    def params(self, accountNumber):
+        return {'companyId': self.companyId, 'parentCompanyId': self.parentCompanyId, 'accountNumber': accountNumber}
+
+    def fetch(self, accountNumber):
+        return self.client.product(self.product).inquiryAccountHistory(self.params(accountNumber))
+
+    def cutoff(self, lastTime):
+        if lastTime is None:
+            return None
+        return (datetime.strptime(lastTime, '%Y-%m-%dT%H:%M:%S') - self.overlap).strftime('%Y-%m-%dT%H:%M:%S')
+
+    def load(self, accountNumber):
+        cursor = self.store.cursor(accountNumber) or {}
+        since = self.cutoff(cursor.get('lastTime'))
+        return cursor.get('lastKey'), cursor.get('lastTime'), since, self.store.keys(accountNumber, since)
+
+    def scan(self, res, since, seen):
+        # the API always returns the whole history, so the saving is on this side: entries older than the
+        # cursor are dropped on their time alone and only the overlap window is checked against the key index
+        occurrences = Counter()
+        for entry in self.entries(res) or []:
+            when = self.entryTime(entry)
+            if since is not None and when is not None and when < since:
+                continue
+            key = self.entryKey(entry)
+            occurrences[key] += 1
+            key = occurrenceKey(key, occurrences[key])
+            if key in seen:
+                continue
+            seen.add(key)
+            yield entry, key, when
+
+    def newEntries(self, accountNumber, res):
+        lastKey, lastTime, since, seen = self.load(accountNumber)
+        added = []
+        for entry, key, when in self.scan(res, since, seen):
+            added.append((key, when))
+            if when is not None and (lastTime is None or when >= lastTime):
+                lastKey, lastTime = key, when
+            yield entry
+        # only reached once the caller has taken every new entry, so an interrupted sync yields them again
+        self.store.commit(accountNumber, added, lastKey, lastTime, self.cutoff(lastTime))
+
+    def sync(self, accountNumber):
+        return self.newEntries(accountNumber, self.fetch(accountNumber))
+
+    def cursor(self, accountNumber):
+        return self.store.cursor(accountNumber)
+
+    def reset(self, accountNumber):
+        self.store.reset(accountNumber)
+
+
+class AsyncHistorySync(HistorySync):
+    async def sync(self, accountNumber):
+        res = await self.fetch(accountNumber)
+        # sqlite blocks, so the store is read and written from the default executor
+        loop = asyncio.get_running_loop()
+        lastKey, lastTime, since, seen = await loop.run_in_executor(None, self.load, accountNumber)
+        added = []
+        for entry, key, when in self.scan(res, since, seen):
+            added.append((key, when))
+            if when is not None and (lastTime is None or when >= lastTime):
+                lastKey, lastTime = key, when
+            yield entry
+        await loop.run_in_executor(None, self.store.commit, accountNumber, added, lastKey, lastTime,
+                                   self.cutoff(lastTime))
+
+    async def cursor(self, accountNumber):
+        return await asyncio.get_running_loop().run_in_executor(None, self.store.cursor, accountNumber)
+
+    async def reset(self, accountNumber):
+        await asyncio.get_running_loop().run_in_executor(None, self.store.reset, accountNumber)
@@ -0,0 +1,284 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, InvalidStateError
+from bnipython.lib.util.transactionStatus import SUCCESS, FAILED, transactionState
+
+# kind -> (client product, status method, product name the status codes are read for)
+statusMethods = {
+    'ogp': ('ogp', 'getPaymentStatus', 'OneGatePayment'),
+    'snap': ('snap', 'transactionStatusInquiry', 'SnapBI'),
+    'rdn': ('rdn', 'inquiryPaymentStatus', 'RDN'),
+    'rdl': ('rdl', 'inquiryPaymentStatus', 'RDL'),
+    'rdf': ('rdf', 'inquiryPaymentStatus', 'RDF')
+}
+
+# seconds before the first poll, growth per poll and the longest gap; RTGS and SKN settle in batches
+# during the day, so polling them like an intrabank transfer only burns the rate limit
+defaultRails = {
+    'intrabank': {'initial': 2, 'factor': 1.5, 'max': 30},
+    'interbank': {'initial': 5, 'factor': 1.5, 'max': 60},
+    'rtgs': {'initial': 30, 'factor': 2, 'max': 300},
+    'skn': {'initial': 60, 'factor': 2, 'max': 900},
+    'clearing': {'initial': 60, 'factor': 2, 'max': 900}
+}
+
+snapRails = {'17': 'intrabank', '18': 'interbank', '22': 'rtgs', '23': 'skn'}
+
+
+def isFinal(kind, res):
+    # pending, not found yet or a response without a status are all polled again
+    return transactionState(statusMethods[kind][2], res) in (SUCCESS, FAILED)
+
+
+class PollTimeout(Exception):
+    def __init__(self, kind, params, lastResponse=None, lastError=None):
+        self.kind = kind
+        self.params = params
+        self.lastResponse = lastResponse
+        self.lastError = lastError
+        super().__init__(f'{kind} payment {params} did not reach a final status in time')
+
+
+class PollEntry():
+    def __init__(self, kind, params, rail, future, deadline, delay):
+        self.kind = kind
+        self.params = params
+        self.rail = rail
+        self.future = future
+        self.deadline = deadline
+        self.delay = delay
+        self.attempts = 0
+        self.lastResponse = None
+        self.lastError = None
+
+
+class PaymentStatusPoller():
+    def __init__(self, client, options={'concurrency', 'rails', 'timeout', 'isFinal'}):
+        self.client = client
+        self.concurrency = options.get('concurrency', 8)
+        self.rails = {**defaultRails, **options.get('rails', {})}
+        self.timeout = options.get('timeout', 3600)
+        self.isFinal = options.get('isFinal', isFinal)
+        self.queue = []
+        self.sequence = itertools.count()
+        self.inFlight = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = None
+        self.pool = None
+
+    def rail(self, kind, params, rail):
+        if rail is None:
+            rail = snapRails.get(str(params.get('serviceCode')), 'interbank') if kind == 'snap' else 'intrabank'
+        if rail not in self.rails:
+            raise ValueError(f'Unknown rail {rail}, available: {", ".join(self.rails)}')
+        return rail
+
+    def entry(self, kind, params, rail, future, callback, timeout):
+        if kind not in statusMethods:
+            raise ValueError(f'Unknown payment kind {kind}, available: {", ".join(statusMethods)}')
+        rail = self.rail(kind, params, rail)
+        if callback is not None:
+            future.add_done_callback(callback)
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        return PollEntry(kind, params, rail, future, deadline, self.rails[rail]['initial'])
+
+    def track(self, kind, params, rail=None, callback=None, timeout=None):
+        entry = self.entry(kind, params, rail, Future(), callback, timeout)
+        self.start()
+        self.schedule(entry, entry.delay)
+        return entry.future
+
+    def jitter(self, delay):
+        # spread references tracked in the same burst so they do not poll in lockstep
+        return delay * random.uniform(0.8, 1.2)
+
+    def push(self, entry, delay):
+        heapq.heappush(self.queue, (time.monotonic() + delay, next(self.sequence), entry))
+
+    def schedule(self, entry, delay):
+        with self.condition:
+            if not self.closed:
+                self.push(entry, delay)
+                self.condition.notify()
+                return
+        # close() has stopped the scheduler, so nothing would poll this reference again
+        entry.future.cancel()
+
+    def request(self, entry):
+        product, method, _ = statusMethods[entry.kind]
+        return getattr(self.client.product(product), method)(entry.params)
+
+    def resolve(self, future, result=None, error=None):
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except (InvalidStateError, asyncio.InvalidStateError):
+            # cancelled by the caller while the poll was in flight
+            pass
+
+    def settle(self, entry, response, error):
+        entry.attempts += 1
+        if error is None and self.isFinal(entry.kind, response):
+            self.resolve(entry.future, response)
+            return
+        entry.lastResponse = response if error is None else entry.lastResponse
+        entry.lastError = error
+        rail = self.rails[entry.rail]
+        entry.delay = min(rail['max'], entry.delay * rail['factor'])
+        if time.monotonic() + entry.delay > entry.deadline:
+            self.resolve(entry.future, error=PollTimeout(entry.kind, entry.params, entry.lastResponse, error))
+            return
+        self.schedule(entry, self.jitter(entry.delay))
+
+    def poll(self, entry):
+        try:
+            if entry.future.cancelled():
+                return
+            try:
+                response, error = self.request(entry), None
+            except Exception as e:
+                # a status lookup that fails, including "not found yet", is retried on the next poll
+                response, error = None, e
+            self.settle(entry, response, error)
+        finally:
+            with self.condition:
+                self.inFlight -= 1
+                self.condition.notify()
+
+    def start(self):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('the poller is closed')
+            if self.thread is not None:
+                return
+            self.pool = ThreadPoolExecutor(self.concurrency, thread_name_prefix='bnipython-status-poll')
+            self.thread = threading.Thread(target=self.run, name='bnipython-status-poller', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        # one scheduler thread hands the earliest due reference to the pool whenever a slot is free, so the
+        # concurrency budget is shared by every rail
+        with self.condition:
+            while not self.closed:
+                if not self.queue or self.inFlight >= self.concurrency:
+                    self.condition.wait()
+                    continue
+                wait = self.queue[0][0] - time.monotonic()
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+                entry = heapq.heappop(self.queue)[2]
+                self.inFlight += 1
+                self.pool.submit(self.poll, entry)
+
+    def pending(self):
+        with self.condition:
+            return len(self.queue) + self.inFlight
+
+    def close(self, wait=True):
+        with self.condition:
+            self.closed = True
+            queued = [item[2] for item in self.queue]
+            self.queue = []
+            self.condition.notify_all()
+        for entry in queued:
+            entry.future.cancel()
+        if self.thread is not None:
+            self.thread.join()
+            self.pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncPaymentStatusPoller(PaymentStatusPoller):
+    def __init__(self, client, options={'concurrency', 'rails', 'timeout', 'isFinal'}):
+        super().__init__(client, options)
+        self.wakeup = None
+        self.runner = None
+        self.tasks = set()
+
+    def track(self, kind, params, rail=None, callback=None, timeout=None):
+        entry = self.entry(kind, params, rail, asyncio.get_running_loop().create_future(), callback, timeout)
+        self.start()
+        self.schedule(entry, entry.delay)
+        return entry.future
+
+    def schedule(self, entry, delay):
+        if self.closed:
+            entry.future.cancel()
+            return
+        self.push(entry, delay)
+        self.wakeup.set()
+
+    async def poll(self, entry):
+        try:
+            if entry.future.cancelled():
+                return
+            try:
+                response, error = await self.request(entry), None
+            except asyncio.CancelledError:
+                # close(wait=False) cancelled the poll itself
+                entry.future.cancel()
+                raise
+            except Exception as e:
+                response, error = None, e
+            self.settle(entry, response, error)
+        finally:
+            self.inFlight -= 1
+            self.wakeup.set()
+
+    def start(self):
+        if self.closed:
+            raise RuntimeError('the poller is closed')
+        if self.runner is None:
+            self.wakeup = asyncio.Event()
+            self.runner = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        while not self.closed:
+            self.wakeup.clear()
+            wait = None
+            if self.queue and self.inFlight < self.concurrency:
+                wait = self.queue[0][0] - time.monotonic()
+                if wait <= 0:
+                    entry = heapq.heappop(self.queue)[2]
+                    self.inFlight += 1
+                    task = asyncio.get_running_loop().create_task(self.poll(entry))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+                    continue
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self, wait=True):
+        self.closed = True
+        for item in self.queue:
+            item[2].future.cancel()
+        self.queue = []
+        if self.runner is not None:
+            self.wakeup.set()
+            await self.runner
+        if wait and self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        else:
+            for task in self.tasks:
+                task.cancel()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
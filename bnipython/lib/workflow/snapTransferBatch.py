@@ -0,0 +1,115 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from bnipython.lib.util.idGenerator import getIdGenerator
+
+
+class SnapTransferBatch():
+    methods = {
+        'intrabank': 'transferIntraBank',
+        'interbank': 'transferInterBank',
+        'rtgs': 'transferRTGS',
+        'skn': 'transferSKNBI'
+    }
+
+    def __init__(self, client, options={'concurrency', 'ordered'}):
+        self.client = client
+        self.concurrency = options.get('concurrency', 8)
+        self.ordered = options.get('ordered', True)
+
+    def item(self, index, spec, seen):
+        # every transfer gets its own partnerReferenceNo; X-EXTERNAL-ID is already unique per request but only
+        # within a day, and a reference has to stay unique for as long as the bank keeps the transfer
+        params = {key: value for key, value in spec.items() if key != 'type'}
+        if not params.get('partnerReferenceNo'):
+            params['partnerReferenceNo'] = getIdGenerator().uuid()
+        result = {'index': index, 'type': spec.get('type'), 'partnerReferenceNo': params['partnerReferenceNo']}
+        if result['type'] not in self.methods:
+            result['error'] = ValueError(f'Unknown transfer type {result["type"]}, available: {", ".join(self.methods)}')
+        elif params['partnerReferenceNo'] in seen:
+            result['error'] = ValueError(f'partnerReferenceNo {params["partnerReferenceNo"]} is used twice in this batch')
+        seen.add(params['partnerReferenceNo'])
+        return result, params
+
+    def transfer(self, result, params):
+        if 'error' in result:
+            return result
+        try:
+            result['response'] = getattr(self.client.snap, self.methods[result['type']])(params)
+        except Exception as e:
+            result['error'] = e
+        return result
+
+    def completed(self, pending, block):
+        if self.ordered:
+            while pending and (block or pending[0].done()):
+                yield pending.popleft().result()
+                block = False
+            return
+        done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+            yield future.result()
+
+    def run(self, specs):
+        # results stream out while later transfers are still being sent; with ordered=False they come in
+        # completion order, otherwise in input order
+        self.client.snap.getTokenSnapBI()
+        seen = set()
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='bnipython-snap-batch') as pool:
+            pending = deque() if self.ordered else set()
+            for index, spec in enumerate(specs):
+                future = pool.submit(self.transfer, *self.item(index, spec, seen))
+                if self.ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+                yield from self.completed(pending, len(pending) >= self.concurrency)
+            while pending:
+                yield from self.completed(pending, True)
+
+
+class AsyncSnapTransferBatch(SnapTransferBatch):
+    async def transfer(self, result, params):
+        if 'error' in result:
+            return result
+        try:
+            result['response'] = await getattr(self.client.snap, self.methods[result['type']])(params)
+        except Exception as e:
+            result['error'] = e
+        return result
+
+    async def completed(self, pending, block):
+        if self.ordered:
+            finished = []
+            while pending and (block or pending[0].done()):
+                finished.append(await pending.popleft())
+                block = False
+            return finished
+        if not block:
+            done = [task for task in pending if task.done()]
+        else:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            pending.remove(task)
+        return [task.result() for task in done]
+
+    async def run(self, specs):
+        await self.client.snap.getTokenSnapBI()
+        seen = set()
+        pending = deque() if self.ordered else set()
+        try:
+            for index, spec in enumerate(specs):
+                task = asyncio.ensure_future(self.transfer(*self.item(index, spec, seen)))
+                if self.ordered:
+                    pending.append(task)
+                else:
+                    pending.add(task)
+                for result in await self.completed(pending, len(pending) >= self.concurrency):
+                    yield result
+            while pending:
+                for result in await self.completed(pending, True):
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,40 @@
+import csv
+import json
+import os
+
+
+def readCsv(path, encoding='utf-8'):
+    with open(path, newline='', encoding=encoding) as rows:
+        for row in csv.DictReader(rows):
+            yield row
+
+
+def readJsonLines(path, encoding='utf-8'):
+    with open(path, encoding=encoding) as rows:
+        for line in rows:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def readJson(path, encoding='utf-8'):
+    # a JSON document has to be parsed whole; use .jsonl to stream a large file
+    with open(path, encoding=encoding) as document:
+        rows = json.load(document)
+    if not isinstance(rows, list):
+        raise ValueError(f'{path} must hold a JSON array of rows')
+    return iter(rows)
+
+
+def readRows(source, encoding='utf-8'):
+    # rows are read one at a time, so a payroll file of any size costs no more memory than a row
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.lower().endswith('.csv'):
+            return readCsv(path, encoding)
+        if path.lower().endswith(('.jsonl', '.ndjson')):
+            return readJsonLines(path, encoding)
+        if path.lower().endswith('.json'):
+            return readJson(path, encoding)
+        raise ValueError(f'Unknown row file {path}, use a .csv, .jsonl or .json file or pass an iterable of dicts')
+    return iter(source)
@@ -9,8 +9,18 @@ long_description = (here / 'README.md').read_text(encoding='utf-8')
 pkg_req = [
     'requests>=2.25.0',
     'pyOpenSSL>=22.0.0',
+    'cryptography>=38.0.0',
     'pytz>=2022.2.1'
 ]
+async_req = [
+    'httpx>=0.23.0'
+]
+http2_req = [
+    'httpx[http2]>=0.23.0'
+]
+fast_req = [
+    'orjson>=3.6.0'
+]
 test_req = pkg_req + [
     'pytest>=3.0.6'
 ]
@@ -25,19 +35,22 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/bni-api/bni-python-sdk/",
-    packages=['bnipython','bnipython.lib','bnipython.lib.api','bnipython.lib.net','bnipython.lib.util'],
+    packages=['bnipython','bnipython.lib','bnipython.lib.api','bnipython.lib.net','bnipython.lib.util','bnipython.lib.workflow'],
     classifiers=[
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
         'Programming Language :: Python :: 3 :: Only',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.9',
         'Programming Language :: Python :: 3.10',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
-    python_requires='>=3.5',
+    python_requires='>=3.7',
     install_requires=pkg_req,
+    extras_require={
+        'async': async_req,
+        'http2': http2_req,
+        'fast': fast_req
+    },
 )
\ No newline at end of file
@@ -0,0 +1,61 @@
+from bnipython.lib.workflow.balanceSnapshot import BalanceSnapshot
+from bnipython.lib.util.signer import Signer
+
+
+class FakeRDN():
+    def inquiryAccountBalance(self, params):
+        if params['accountNumber'] == 'missing':
+            return {'response': {'responseCode': '0001'}}
+        return {'response': {
+            'responseCode': '0001',
+            'responseMessage': 'Request has been processed successfully',
+            'responseTimestamp': '2024-01-31T10:00:00.000Z',
+            'responseUuid': 'E8C6E0027F6E429F',
+            'accountCurrency': 'IDR',
+            'accountBalance': 1500000
+        }}
+
+
+class FakeSnap():
+    def balanceInquiry(self, params):
+        return {
+            'responseCode': '2001100',
+            'responseMessage': 'Successful',
+            'accountNo': params['accountNo'],
+            'accountInfos': [{
+                'balanceType': 'Cash',
+                'amount': {'value': '2000000.00', 'currency': 'IDR'},
+                'availableBalance': {'value': '1750000.00', 'currency': 'IDR'},
+                'ledgerBalance': {'value': '2000000.00', 'currency': 'IDR'}
+            }]
+        }
+
+
+class FakeClient():
+    def __init__(self):
+        self.signer = Signer({'apiSecret': 'secret', 'appName': 'app'})
+        self.products = {'rdn': FakeRDN(), 'snap': FakeSnap()}
+
+    def product(self, name):
+        return self.products[name]
+
+
+def rows(product, accounts):
+    snapshot = BalanceSnapshot(FakeClient(), {'product': product, 'companyId': 'SANDBOX', 'concurrency': 2})
+    return sorted(row for chunk in snapshot.run(accounts) for row in chunk.rows())
+
+
+def test_rdn_rows_follow_the_documented_response():
+    assert rows('rdn', ['0115476117']) == [('0115476117', 1500000, 'IDR', '2024-01-31T10:00:00.000Z', None)]
+
+
+def test_snap_rows_take_the_available_balance():
+    [(account, balance, currency, timestamp, error)] = rows('snap', ['0115476117'])
+    assert (account, balance, currency, error) == ('0115476117', '1750000.00', 'IDR', None)
+    assert timestamp.endswith('+07:00')
+
+
+def test_a_response_without_the_balance_becomes_an_error_row():
+    [(account, balance, currency, timestamp, error)] = rows('rdn', ['missing'])
+    assert (account, balance, currency) == ('missing', None, None)
+    assert 'accountBalance' in error
@@ -0,0 +1,78 @@
+import pytest
+import requests
+from bnipython.lib.net.circuitBreaker import CircuitOpenError
+from bnipython.lib.net.deadline import DeadlineExceeded
+from bnipython.lib.net.rateLimiter import RateLimitExceeded
+from bnipython.lib.util.response import ResponseError
+from bnipython.lib.workflow.bulkPayment import BulkPayment, paymentFields, DONE, FAILED, UNKNOWN, NOT_SENT
+
+
+class FakeOgp():
+    def __init__(self, errors=(), statusError=None):
+        self.errors = list(errors)
+        self.statusError = statusError
+        self.paid = []
+
+    def doPayment(self, row):
+        self.paid.append(row['customerReferenceNumber'])
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'doPaymentResponse': {'parameters': {'responseCode': '0001'}}}
+
+    def getPaymentStatus(self, params):
+        raise self.statusError
+
+
+class FakeClient():
+    def __init__(self, ogp):
+        self.ogp = ogp
+
+
+def row(reference):
+    return {name: reference if name == 'customerReferenceNumber' else 'x' for name in paymentFields}
+
+
+def run(ogp, checkpoint, rows=None):
+    results = []
+    summary = BulkPayment(FakeClient(ogp), {'checkpoint': checkpoint, 'concurrency': 1,
+                                            'onResult': results.append}).run(rows or [row('ref1')])
+    return summary, results[-1]['state']
+
+
+@pytest.mark.parametrize('error', [
+    CircuitOpenError(('OneGatePayment', '/H2H/v2/dopayment'), 1.0),
+    RateLimitExceeded('OneGatePayment', 1.0),
+    DeadlineExceeded('deadline of 1s exceeded'),
+    requests.exceptions.ConnectTimeout('connect timeout')
+])
+def test_payment_that_never_left_is_sent_again(tmp_path, error):
+    checkpoint = str(tmp_path / 'checkpoint.jsonl')
+    ogp = FakeOgp([error])
+    assert run(ogp, checkpoint)[1] == NOT_SENT
+    assert run(ogp, checkpoint)[1] == DONE
+    assert ogp.paid == ['ref1', 'ref1']
+
+
+def test_unreadable_response_is_unknown_not_failed(tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.jsonl')
+    assert run(FakeOgp([KeyError('parameters')]), checkpoint)[1] == UNKNOWN
+
+
+def test_gateway_rejection_is_failed(tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.jsonl')
+    assert run(FakeOgp([ResponseError('insufficient balance', '0105')]), checkpoint)[1] == FAILED
+
+
+def test_row_missing_payment_fields_is_failed_without_sending(tmp_path):
+    ogp = FakeOgp()
+    assert run(ogp, str(tmp_path / 'checkpoint.jsonl'), [{'customerReferenceNumber': 'ref1'}])[1] == FAILED
+    assert ogp.paid == []
+
+
+def test_unanswered_status_lookup_keeps_the_row_unknown(tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.jsonl')
+    ogp = FakeOgp([requests.exceptions.ReadTimeout('read timeout')])
+    assert run(ogp, checkpoint)[1] == UNKNOWN
+    ogp.statusError = CircuitOpenError(('OneGatePayment', '/H2H/v2/getpaymentstatus'), 1.0)
+    assert run(ogp, checkpoint)[1] == UNKNOWN
+    assert ogp.paid == ['ref1']
@@ -0,0 +1,41 @@
+import json
+from bnipython.lib.net.retry import StatusCheckResult
+from bnipython.lib.util.codec import LazyResponse
+from bnipython.lib.util.transactionStatus import SUCCESS
+from bnipython.lib.workflow.bulkPayment import BulkPayment, DONE
+
+
+def statusResponse():
+    raw = b'{"getPaymentStatusResponse": {"parameters": {"responseCode": "0001", ' \
+          b'"previousResponse": {"transactionStatus": "Y", "valueAmount": "100"}}}}'
+    return StatusCheckResult(LazyResponse(raw), SUCCESS)
+
+
+def test_recorded_response_round_trips_through_the_output(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    bulk = BulkPayment(None, {'checkpoint': str(tmp_path / 'checkpoint.jsonl'), 'output': str(output)})
+    bulk.open()
+    try:
+        bulk.record('ref1', DONE, {'nested': [statusResponse()], 'status': statusResponse()})
+    finally:
+        bulk.close()
+    record = json.loads(output.read_text(encoding='utf-8'))
+    expected = {'getPaymentStatusResponse': {'parameters': {
+        'responseCode': '0001', 'previousResponse': {'transactionStatus': 'Y', 'valueAmount': '100'}}}}
+    assert record == {'customerReferenceNumber': 'ref1', 'state': DONE,
+                      'response': {'nested': [expected], 'status': expected}}
+
+
+def test_checkpoint_journal_reads_back(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    bulk = BulkPayment(None, {'checkpoint': path})
+    bulk.open()
+    try:
+        bulk.record('ref1', DONE, statusResponse())
+    finally:
+        bulk.close()
+    bulk.open()
+    try:
+        assert bulk.checkpoint.state('ref1') == DONE
+    finally:
+        bulk.close()
@@ -0,0 +1,30 @@
+import threading
+import pytest
+from bnipython.lib.net.circuitBreaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+def trip(breaker):
+    for i in range(breaker.minimumCalls):
+        breaker.acquire()
+        breaker.record(False, 0.0)
+
+
+def test_listener_can_read_the_breaker():
+    seen = []
+    breaker = CircuitBreaker(('SnapBI', '/x'), minimumCalls=2, openDuration=0.0, halfOpenProbes=1,
+                             onStateChange=lambda key, previous, state: seen.append(breaker.snapshot()['state']))
+    worker = threading.Thread(target=lambda: (trip(breaker), breaker.acquire(), breaker.record(True, 0.0)))
+    worker.start()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert seen == [OPEN, HALF_OPEN, CLOSED]
+
+
+def test_failing_listener_does_not_fail_the_call():
+    def listener(key, previous, state):
+        raise RuntimeError('listener failed')
+    breaker = CircuitBreaker(('SnapBI', '/x'), minimumCalls=2, openDuration=60.0, onStateChange=listener)
+    trip(breaker)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
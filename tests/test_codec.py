@@ -0,0 +1,32 @@
+import datetime
+import uuid
+import pytest
+from bnipython.lib.util.codec import JsonCodec, OrjsonCodec, orjson
+
+pytestmark = pytest.mark.skipif(orjson is None, reason='orjson is not installed')
+
+
+@pytest.mark.parametrize('body', [
+    {'accountNo': '0115476117', 'amount': 10000, 'paid': True, 'note': None, 'items': [1, 'a']},
+    {'amount': 1e16},
+    {'amount': 1.5e-7},
+    {'amount': 10000.5},
+    {'amount': float('nan')},
+    {'amount': float('inf')},
+    {'name': 'Budi Süsilo'},
+    {1: 'a'}
+])
+def test_orjson_writes_the_same_bytes_as_json(body):
+    assert OrjsonCodec().dumps(body) == JsonCodec().dumps(body)
+
+
+@pytest.mark.parametrize('value', [
+    datetime.date(2024, 1, 2),
+    datetime.datetime(2024, 1, 2, 3, 4, 5),
+    uuid.UUID(int=1)
+])
+def test_orjson_rejects_what_json_rejects(value):
+    with pytest.raises(TypeError):
+        JsonCodec().dumps({'value': value})
+    with pytest.raises(TypeError):
+        OrjsonCodec().dumps({'value': value})
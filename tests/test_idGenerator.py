@@ -0,0 +1,15 @@
+from bnipython.lib.util.idGenerator import IdGenerator
+
+
+def test_external_id_keeps_pids_a_million_apart_distinct():
+    first = IdGenerator(node=194303).externalId()
+    second = IdGenerator(node=4194303).externalId()
+    assert len(first) == len(second) == 19
+    assert first[9:16] == '0194303'
+    assert second[9:16] == '4194303'
+
+
+def test_external_ids_are_unique_past_the_sequence_limit():
+    generator = IdGenerator(node=1)
+    ids = [generator.externalId() for _ in range(5000)]
+    assert len(set(ids)) == len(ids)
@@ -0,0 +1,190 @@
+import asyncio
+import pytest
+from bnipython.lib.net import httpClient
+from bnipython.lib.net.asyncHttpClient import AsyncHttpClient
+from bnipython.lib.net.httpClient import HttpClient
+from bnipython.lib.net.retry import SAFE, STATUS_CHECK, UNSAFE, RetryBudget, RetryPolicy, StatusCheckResult, AmbiguousOutcome
+from bnipython.lib.util.response import ResponseError, TransactionFailed, responseSnapBI
+from bnipython.lib.util.transactionStatus import SUCCESS, FAILED
+
+
+class FakeResponse():
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+
+class FakeTransport():
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def request(self, method, url, headers, body, timeout):
+        self.requests.append(body)
+        status = self.statuses.pop(0)
+        if status == 200:
+            return FakeResponse(200, b'{"responseCode": "2001700", "responseMessage": "Successful"}')
+        return FakeResponse(status, b'{"responseCode": "5001700", "responseMessage": "Unavailable"}')
+
+    def transmit(self, prepared):
+        return self.request(prepared['method'], prepared['url'], prepared['headers'], prepared['data'], None)
+
+
+class StatusCheck():
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def client(statuses, budget=None):
+    transport = FakeTransport(statuses)
+    policy = RetryPolicy(maxAttempts=3, backoffBase=0, jitter=False, budget=budget, statusCheckDelay=0)
+    http = HttpClient(options={'retry': policy})
+    http.transmit = transport.transmit
+    return http, transport
+
+
+def prepared(idempotency, statusCheck=None):
+    return {
+        'method': 'POST',
+        'url': 'https://gateway.test/snap-service/v1/transfer-intrabank',
+        'path': '/snap-service/v1/transfer-intrabank',
+        'headers': {},
+        'data': '{}',
+        'product': 'SnapBI',
+        'idempotency': idempotency,
+        'statusCheck': statusCheck
+    }
+
+
+def snapStatus(latestTransactionStatus):
+    return {'responseCode': '2003600', 'latestTransactionStatus': latestTransactionStatus}
+
+
+@pytest.mark.parametrize('idempotency', [SAFE, STATUS_CHECK, UNSAFE])
+def test_not_sent_is_resent_for_every_idempotency(idempotency):
+    check = StatusCheck(snapStatus('00'))
+    http, transport = client([429, 200])
+    res = http.send(prepared(idempotency, check))
+    assert res['responseCode'] == '2001700'
+    assert len(transport.requests) == 2
+    assert check.calls == 0
+
+
+def test_ambiguous_safe_request_is_resent():
+    http, transport = client([503, 200])
+    res = http.send(prepared(SAFE))
+    assert res['responseCode'] == '2001700'
+    assert len(transport.requests) == 2
+
+
+def test_ambiguous_unsafe_request_is_not_resent():
+    http, transport = client([503, 200])
+    res = http.send(prepared(UNSAFE))
+    assert res['responseCode'] == '5001700'
+    assert len(transport.requests) == 1
+
+
+@pytest.mark.parametrize('latestTransactionStatus, state', [('00', SUCCESS), ('06', FAILED)])
+def test_ambiguous_status_check_returns_the_reported_status(latestTransactionStatus, state):
+    check = StatusCheck(snapStatus(latestTransactionStatus))
+    http, transport = client([503, 200])
+    res = http.send(prepared(STATUS_CHECK, check))
+    assert isinstance(res, StatusCheckResult)
+    assert res.state == state
+    assert res['latestTransactionStatus'] == latestTransactionStatus
+    assert len(transport.requests) == 1
+
+
+def test_failed_status_check_result_is_raised_by_the_response_handler():
+    result = StatusCheckResult(snapStatus('06'), FAILED)
+    with pytest.raises(TransactionFailed):
+        responseSnapBI({'res': result})
+    assert responseSnapBI({'res': StatusCheckResult(snapStatus('00'), SUCCESS)})['latestTransactionStatus'] == '00'
+
+
+def test_ambiguous_status_check_resends_when_the_transaction_is_not_found():
+    check = StatusCheck(error=ResponseError('not found', '4043601'))
+    http, transport = client([503, 200])
+    res = http.send(prepared(STATUS_CHECK, check))
+    assert res['responseCode'] == '2001700'
+    assert len(transport.requests) == 2
+
+
+def test_ambiguous_status_check_resends_when_the_status_reports_not_found():
+    check = StatusCheck(snapStatus('07'))
+    http, transport = client([503, 200])
+    res = http.send(prepared(STATUS_CHECK, check))
+    assert res['responseCode'] == '2001700'
+    assert len(transport.requests) == 2
+
+
+@pytest.mark.parametrize('error', [ResponseError('unauthorized', '4013601'), ConnectionError('reset')])
+def test_ambiguous_status_check_error_is_not_resent(error):
+    check = StatusCheck(error=error)
+    http, transport = client([503, 200])
+    with pytest.raises(AmbiguousOutcome) as raised:
+        http.send(prepared(STATUS_CHECK, check))
+    assert raised.value.statusError is error
+    assert raised.value.statusCode == 503
+    assert len(transport.requests) == 1
+
+
+def test_status_check_waits_for_the_settle_delay(monkeypatch):
+    events = []
+
+    def statusCheck():
+        events.append('check')
+        return snapStatus('07')
+    monkeypatch.setattr(httpClient.time, 'sleep', lambda delay: events.append(delay))
+    transport = FakeTransport([503, 200])
+    policy = RetryPolicy(maxAttempts=3, backoffBase=0, jitter=False, statusCheckDelay=1.5)
+    http = HttpClient(options={'retry': policy})
+    http.transmit = transport.transmit
+    res = http.send(prepared(STATUS_CHECK, statusCheck))
+    assert res['responseCode'] == '2001700'
+    assert events == [1.5, 'check']
+
+
+def test_async_status_check_waits_for_the_settle_delay(monkeypatch):
+    events = []
+    responses = [FakeResponse(503, b'{}'), FakeResponse(200, b'{"responseCode": "2001700"}')]
+
+    async def transmit(prepared):
+        events.append('send')
+        return responses.pop(0)
+
+    async def sleep(delay):
+        events.append(delay)
+
+    async def statusCheck():
+        events.append('check')
+        return snapStatus('07')
+
+    async def run():
+        policy = RetryPolicy(maxAttempts=3, backoffBase=0, jitter=False, statusCheckDelay=1.5)
+        http = AsyncHttpClient(options={'retry': policy})
+        monkeypatch.setattr(http, 'transmit', transmit)
+        monkeypatch.setattr(asyncio, 'sleep', sleep)
+        try:
+            return await http.send(prepared(STATUS_CHECK, statusCheck))
+        finally:
+            await http.session.aclose()
+    res = asyncio.run(run())
+    assert res['responseCode'] == '2001700'
+    assert events == ['send', 1.5, 'check', 'send']
+
+
+def test_exhausted_budget_stops_retrying():
+    budget = RetryBudget(ratio=0, minPerSecond=0, maxBalance=1)
+    http, transport = client([503, 503, 200], budget)
+    res = http.send(prepared(SAFE))
+    assert res['responseCode'] == '5001700'
+    assert len(transport.requests) == 2
@@ -0,0 +1,21 @@
+import re
+from bnipython.lib.net.httpClient import prepareTokenRequestSnapBI
+from bnipython.lib.util.signer import Signer
+
+
+class FakeKey():
+    def sign(self, data):
+        return f'signed:{data}'
+
+
+def test_snap_token_request_is_stamped_by_the_signer():
+    timeStamp = Signer({'apiSecret': 'secret', 'appName': 'app'}).timestamp()
+    assert re.fullmatch(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\+07:00', timeStamp)
+    prepared = prepareTokenRequestSnapBI({
+        'url': 'https://gateway.test/snap/v1/access-token/b2b',
+        'clientId': 'client',
+        'signingKey': FakeKey(),
+        'timeStamp': timeStamp
+    })
+    assert prepared['headers']['X-TIMESTAMP'] == timeStamp
+    assert prepared['headers']['X-SIGNATURE'] == f'signed:client|{timeStamp}'
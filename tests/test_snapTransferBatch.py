@@ -0,0 +1,27 @@
+from bnipython.lib.workflow.snapTransferBatch import SnapTransferBatch
+
+
+class FakeSnap():
+    def __init__(self):
+        self.references = []
+
+    def getTokenSnapBI(self):
+        pass
+
+    def transferIntraBank(self, params):
+        self.references.append(params['partnerReferenceNo'])
+        return {'responseCode': '2001700'}
+
+
+class FakeClient():
+    def __init__(self):
+        self.snap = FakeSnap()
+
+
+def test_generated_references_are_16_character_ids():
+    client = FakeClient()
+    results = list(SnapTransferBatch(client, {'concurrency': 2}).run([{'type': 'intrabank'}] * 3))
+    references = [result['partnerReferenceNo'] for result in results]
+    assert sorted(references) == sorted(client.snap.references)
+    assert len(set(references)) == 3
+    assert all(len(reference) == 16 for reference in references)
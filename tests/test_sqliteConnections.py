@@ -0,0 +1,23 @@
+import threading
+from bnipython.lib.util.sqliteConnections import SqliteConnections
+
+
+def test_each_thread_gets_its_own_connection(tmp_path):
+    connections = SqliteConnections(str(tmp_path / 'store.sqlite'), ('synchronous=NORMAL',))
+    main = connections.get()
+    assert connections.get() is main
+    other = []
+    thread = threading.Thread(target=lambda: other.append(connections.get()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main
+    assert main.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert main.execute('PRAGMA synchronous').fetchone()[0] == 1
+
+
+def test_a_forked_child_opens_a_new_connection(tmp_path):
+    connections = SqliteConnections(str(tmp_path / 'store.sqlite'))
+    parent = connections.get()
+    # what a forked child sees: the parent's connection, recorded under the parent's pid
+    connections.local.pid = -1
+    assert connections.get() is not parent
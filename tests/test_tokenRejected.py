@@ -0,0 +1,76 @@
+import pytest
+from bnipython.lib.net.httpClient import HttpClient
+from bnipython.lib.net.retry import SAFE
+from bnipython.lib.util.response import TokenRejected
+
+
+class FakeResponse():
+    def __init__(self, status_code, content, headers={}):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+
+class RejectingTransport():
+    # rejects every token in rejected the way an OAuth resource server does: 401, a challenge, no body
+    def __init__(self, rejected):
+        self.rejected = rejected
+        self.tokens = []
+
+    def request(self, method, url, headers, body, timeout):
+        token = headers['Authorization'].split(' ')[1]
+        self.tokens.append(token)
+        if token in self.rejected:
+            return FakeResponse(401, b'', {'WWW-Authenticate': 'Bearer error="invalid_token"'})
+        return FakeResponse(200, b'{"responseCode": "0001"}')
+
+    def transmit(self, prepared):
+        return self.request(prepared['method'], prepared['url'], prepared['headers'], prepared['data'], None)
+
+
+def prepared(token):
+    return {
+        'method': 'POST',
+        'url': 'https://gateway.test/H2H/v2/getbalance',
+        'path': '/H2H/v2/getbalance',
+        'headers': {'Authorization': f'Bearer {token}'},
+        'data': '{}',
+        'product': 'OneGatePayment',
+        'idempotency': SAFE,
+        'accessToken': token
+    }
+
+
+class Tokens():
+    def __init__(self, *tokens):
+        self.tokens = list(tokens)
+        self.invalidated = []
+
+    def get(self):
+        return self.tokens[0]
+
+    def invalidate(self, token):
+        self.invalidated.append(token)
+        self.tokens.pop(0)
+
+
+def test_challenge_without_body_refreshes_the_token():
+    transport = RejectingTransport({'old'})
+    http = HttpClient(options={'circuitBreaker': False, 'retry': False})
+    http.transmit = transport.transmit
+    tokens = Tokens('old', 'new')
+    res = http.authorized(tokens.get, tokens.invalidate, lambda token: http.send(prepared(token)))
+    assert res['responseCode'] == '0001'
+    assert tokens.invalidated == ['old']
+    assert transport.tokens == ['old', 'new']
+
+
+def test_second_rejection_raises_token_rejected():
+    transport = RejectingTransport({'old', 'new'})
+    http = HttpClient(options={'circuitBreaker': False, 'retry': False})
+    http.transmit = transport.transmit
+    tokens = Tokens('old', 'new')
+    with pytest.raises(TokenRejected) as raised:
+        http.authorized(tokens.get, tokens.invalidate, lambda token: http.send(prepared(token)))
+    assert raised.value.response is None
+    assert raised.value.token == 'new'
@@ -0,0 +1,72 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from bnipython.lib.net.httpClient import HttpClient
+from bnipython.lib.net.retry import SAFE
+from bnipython.lib.net.transport import http2Available
+
+
+class Handler(BaseHTTPRequestHandler):
+    # rejects the token 'old' with a bare RFC 6750 challenge, the reason lives only in the header
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers['Authorization'] == 'Bearer old':
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Bearer error="invalid_token"')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = b'{"responseCode": "0001"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def prepared(server, token):
+    return {
+        'method': 'POST',
+        'url': f'{server}/H2H/v2/getbalance',
+        'path': '/H2H/v2/getbalance',
+        'headers': {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+        'data': '{}',
+        'product': 'OneGatePayment',
+        'idempotency': SAFE,
+        'accessToken': token
+    }
+
+
+@pytest.mark.parametrize('transport', [
+    'requests',
+    'urllib3',
+    pytest.param('http2', marks=pytest.mark.skipif(not http2Available(), reason='httpx[http2] is not installed'))
+])
+def test_invalid_token_challenge_refreshes_the_token(server, transport):
+    http = HttpClient(options={'transport': transport, 'circuitBreaker': False, 'retry': False})
+    tokens = ['old', 'new']
+    invalidated = []
+
+    def invalidate(token):
+        invalidated.append(token)
+        tokens.pop(0)
+
+    try:
+        res = http.authorized(lambda: tokens[0], invalidate, lambda token: http.send(prepared(server, token)))
+    finally:
+        http.close()
+    assert res['responseCode'] == '0001'
+    assert invalidated == ['old']